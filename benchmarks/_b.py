@@ -0,0 +1,6 @@
+import sys
+import os
+
+sys.path.insert(0, os.getcwd())
+
+__all__ = []
\ No newline at end of file
@@ -0,0 +1,325 @@
+"""
+Benchmark of the MyVideo database layer at increasing table sizes, on a spawned (`--spawn`) or an empty DB_* database.
+
+    python benchmarks/db_benchmark.py --spawn --sizes 10000 100000 1000000 --output bench.json
+"""
+from _b import *
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+from platform import platform as system_platform
+
+
+PLATFORMS = ['tiktok', 'youtube', 'instagram', 'x']
+NICHES = ['COMMON', 'FOOTBALL', 'GAMING', 'COOKING', 'MUSIC', 'TRAVEL']
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+         'incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud').split()
+STATUS_WEIGHTS = {'DONE': 60, 'READY': 15, 'PROCESSING': 20, 'FLAGGED': 5}
+SEED_BATCH = 5000
+OP_BATCH = 1000
+
+
+### LOCAL POSTGRES ######################################################################################
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def spawn_postgres(workdir: str) -> dict[str, str]:
+    """Initializes and starts a throwaway cluster, returns its DB_* environment."""
+    for binary in ('initdb', 'pg_ctl'):
+        if shutil.which(binary) is None:
+            raise RuntimeError(f'{binary} not found on PATH, install PostgreSQL or configure DB_* variables.')
+
+    data_dir = os.path.join(workdir, 'data')
+    port = _free_port()
+    subprocess.run(['initdb', '-D', data_dir, '-U', 'bench', '--auth=trust', '-E', 'UTF8'],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run(['pg_ctl', '-D', data_dir, '-w', '-l', os.path.join(workdir, 'postgres.log'),
+                    '-o', f'-p {port} -k {workdir} -c listen_addresses=127.0.0.1', 'start'],
+                   check=True, stdout=subprocess.DEVNULL)
+    return {
+        'DB_USER': 'bench',
+        'DB_PASSWORD': 'bench',
+        'DB_HOST': '127.0.0.1',
+        'DB_PORT': str(port),
+        'DB_DATABASE': 'postgres'
+    }
+
+def stop_postgres(workdir: str) -> None:
+    subprocess.run(['pg_ctl', '-D', os.path.join(workdir, 'data'), '-m', 'fast', 'stop'],
+                   check=False, stdout=subprocess.DEVNULL)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+### MEASURES ######################################################################################
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(rss / (1024 ** 2 if sys.platform == 'darwin' else 1024), 1)
+
+def percentile(values: list[float], q: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+def measure(results: list[dict], scale: int, op: str, func, runs: int, rows_per_run: int | None = None) -> None:
+    """Runs `func` `runs` times, `func` returns the number of rows it processed when `rows_per_run` is None."""
+    latencies = []
+    rows = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        n = func()
+        latencies.append(time.perf_counter() - start)
+        rows += rows_per_run if rows_per_run is not None else (n or 0)
+
+    total = sum(latencies)
+    record = {
+        'scale': scale,
+        'op': op,
+        'runs': runs,
+        'rows': rows,
+        'total_s': round(total, 4),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(total / runs * 1000, 3),
+        'throughput_rows_s': round(rows / total, 1) if total and rows else None,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    results.append(record)
+    print(json.dumps(record), file=sys.stderr)
+
+
+### SYNTHETIC DATA ######################################################################################
+
+def text(rng: random.Random, n_words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(n_words))
+
+def synthetic_kwargs(rng: random.Random, i: int, base: datetime, accounts: list[str]) -> dict:
+    from src import utils
+
+    # 37ms steps keep ids unique at the centisecond resolution of utils.date_to_str
+    id = utils.date_to_str(base + timedelta(milliseconds=37 * i))
+    status = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+
+    publication_dates = {}
+    urls = []
+    if status in ('DONE', 'READY'):
+        for pl in PLATFORMS:
+            roll = rng.random()
+            if status == 'DONE' or roll < 0.4:
+                date = base + timedelta(days=rng.randint(0, 60), seconds=rng.randint(0, 86400))
+                publication_dates[pl] = 'skipped' if rng.random() < 0.05 else utils.date_to_str(date)
+                if publication_dates[pl] != 'skipped':
+                    urls.append(utils.build_video_url(pl, 'bench_author', str(rng.randint(10 ** 17, 10 ** 18))))
+            elif roll < 0.7:
+                publication_dates[pl] = ''
+
+    return dict(
+        id=id,
+        creation_date=id,
+        status=status,
+        niche=rng.choice(NICHES),
+        account=rng.choice(accounts),
+        urls=urls,
+        long_description=text(rng, 80),
+        description=text(rng, 15),
+        hashtags=[rng.choice(WORDS) for _ in range(rng.randint(3, 8))],
+        OCR=text(rng, 30),
+        scene_ids=[f'scene_{rng.randint(0, 10 ** 6)}' for _ in range(rng.randint(5, 20))],
+        publication_dates=publication_dates
+    )
+
+
+### BENCHMARK ######################################################################################
+
+def seed_accounts(n_accounts: int, created: list[str]) -> list[str]:
+    """Returns the benchmark accounts, the ones missing are created and appended to `created` as they go."""
+    from src.dataproc import accounts
+
+    names = [f'bench_account_{i}' for i in range(n_accounts)]
+    for name in names:
+        if not accounts.AccountsDB.account_exists(name):
+            accounts.add_account(name, name, f'{name}@bench.local', platforms=PLATFORMS)
+            created.append(name)
+    # Uploaders are built from the accounts list at import time
+    accounts._accounts = None
+    return names
+
+def remove_accounts(names: list[str]) -> None:
+    from src.dataproc import accounts
+
+    for name in names:
+        accounts.delete_account(name)
+
+def run_scale(scale: int, accounts: list[str], repeat: int, rng: random.Random, results: list[dict]) -> None:
+    from src import utils
+    from src.dataproc.com import UnitOfWork
+    from src.dataproc.myvideo import MyVideo, UListMyVideos
+
+    sys.path.insert(0, os.path.join(os.getcwd(), 'main'))
+    from get_new_post import get_new_post
+    from posts_stats import posts_stats
+
+    # get_new_post copies its result, the clipboard is not part of the measure
+    utils.copy_to_clipboard = lambda text: None
+
+    UListMyVideos.clear_data()
+    base = datetime(2025, 1, 1)
+
+    def seed() -> int:
+        for start in range(0, scale, SEED_BATCH):
+            UListMyVideos(MyVideo(**synthetic_kwargs(rng, i, base, accounts))
+                          for i in range(start, min(start + SEED_BATCH, scale))).save()
+            MyVideo._cache.clear()
+        return scale
+
+    measure(results, scale, 'seed', seed, runs=1)
+
+    ids = UListMyVideos.load_column('id')
+    MyVideo._cache.clear()
+
+    def load() -> int:
+        MyVideo._cache.clear()
+        return int(MyVideo.load(id=rng.choice(ids)) is not None)
+
+    def load_iter() -> int:
+        n = sum(1 for _ in UListMyVideos.load_iter(status=UListMyVideos.statuses.READY, lazy=True))
+        MyVideo._cache.clear()
+        return n
+
+    measure(results, scale, 'load', load, runs=repeat * 10)
+    measure(results, scale, 'load_iter', load_iter, runs=repeat)
+
+    ready = UListMyVideos.load(status=UListMyVideos.statuses.READY)
+    MyVideo._cache.clear()
+
+    def filter_attrs() -> int:
+        ready.filter_attrs(account=rng.choice(accounts))
+        return len(ready)
+
+    measure(results, scale, 'filter_attrs', filter_attrs, runs=repeat)
+
+    def save() -> int:
+        batch = UListMyVideos(ready[rng.randrange(max(1, len(ready) - OP_BATCH)):][:OP_BATCH])
+        batch.save()
+        return len(batch)
+
+    measure(results, scale, 'save', save, runs=repeat)
+
+    def delete() -> int:
+        batch_ids = [ids.pop() for _ in range(min(OP_BATCH, len(ids)))]
+        with UnitOfWork() as uow:
+            uow.delete_ids(UListMyVideos, batch_ids)
+        return len(batch_ids)
+
+    measure(results, scale, 'delete', delete, runs=repeat)
+
+    def run_get_new_post() -> int:
+        try:
+            get_new_post(rng.choice(accounts))
+        except ValueError:
+            # No candidate left for this account, the scan itself was still measured
+            pass
+        MyVideo._cache.clear()
+        return 1
+
+    def run_posts_stats() -> int:
+        posts_stats(rng.choice(accounts))
+        MyVideo._cache.clear()
+        return 1
+
+    measure(results, scale, 'get_new_post', run_get_new_post, runs=repeat)
+    measure(results, scale, 'posts_stats', run_posts_stats, runs=repeat)
+
+    def refresh_data() -> int:
+        UListMyVideos.refresh_data()
+        return len(ids)
+
+    measure(results, scale, 'refresh_data', refresh_data, runs=1)
+
+
+def main(sizes: list[int], n_accounts: int, repeat: int, seed: int, spawn: bool, output: str | None) -> None:
+    workdir = None
+    _DB = None
+    created_accounts: list[str] | None = None   # Set once the database is known to be disposable
+    if spawn:
+        workdir = tempfile.mkdtemp(prefix='unlooped_bench_')
+        os.environ.update(spawn_postgres(workdir))
+
+    try:
+        # Imported only now so the DB_* variables above are the ones used
+        from src.dataproc.com import _DB
+
+        from src.dataproc.myvideo import UListMyVideos
+
+        # Checked before anything is written to the database
+        if UListMyVideos.load_column('id'):
+            raise RuntimeError('MyVideo table is not empty, the benchmark needs a disposable database.')
+
+        created_accounts = []
+        accounts = seed_accounts(n_accounts, created_accounts)
+
+        rng = random.Random(seed)
+        results: list[dict] = []
+        for scale in sizes:
+            run_scale(scale, accounts, repeat, rng, results)
+
+        report = {
+            'meta': {
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'system': system_platform(),
+                'sizes': sizes,
+                'accounts': n_accounts,
+                'repeat': repeat,
+                'seed': seed
+            },
+            'results': results
+        }
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=4)
+        else:
+            print(json.dumps(report, indent=4))
+
+    finally:
+        if workdir is not None:
+            if _DB is not None:
+                _DB.disconnect()
+            stop_postgres(workdir)
+        elif created_accounts is not None:
+            # Configured database: leave it as it was found, empty MyVideo table and no benchmark account
+            from src.dataproc.myvideo import UListMyVideos
+
+            UListMyVideos.clear_data()
+            remove_accounts(created_accounts)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the MyVideo database layer.')
+    parser.add_argument('--sizes', '-s', type=int, nargs='+', default=[10000, 100000, 1000000], help='Table sizes to benchmark')
+    parser.add_argument('--accounts', '-a', type=int, default=5, help='Number of synthetic accounts')
+    parser.add_argument('--repeat', '-r', type=int, default=5, help='Runs per operation (x10 for single row loads)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the synthetic data')
+    parser.add_argument('--spawn', action='store_true', help='Spawn a throwaway local PostgreSQL cluster')
+    parser.add_argument('--output', '-o', default=None, help='JSON output file, stdout otherwise')
+    args = parser.parse_args()
+    main(args.sizes, args.accounts, args.repeat, args.seed, args.spawn, args.output)
@@ -0,0 +1,26 @@
+try:
+    from _b import *
+
+    import argparse
+
+    from src.dataproc.journal import Journal
+
+
+    def flush_journal(show_conflicts: bool = False, once: bool = False) -> str:
+        # Spawned flushers keep trying until the db is reachable and the journal is empty
+        applied, conflicts = Journal.flush() if once else Journal.flush_until_empty()
+        result = f'Journal flushed: {applied} applied, {conflicts} conflicts, {len(Journal.pending())} pending.'
+        if show_conflicts:
+            result += ''.join(f'\n  • {c["entry"]}: {c["reason"]}' for c in Journal.conflicts())
+        return result
+
+
+    if __name__ == '__main__':
+        parser = argparse.ArgumentParser(description='Replay the queued write commands on the db')
+        parser.add_argument('--conflicts', '-c', action='store_true', help='Also list all the reported conflicts')
+        parser.add_argument('--once', action='store_true', help='Single attempt, do not wait for the db to be reachable')
+        args = parser.parse_args()
+        print(flush_journal(args.conflicts, args.once), end='')
+
+except Exception as e:
+    print(f"ERROR:{e}", end='')
\ No newline at end of file
@@ -0,0 +1,26 @@
+try:
+    from _b import *
+
+    import argparse
+    import json
+
+    from src.dataproc.advisor import IndexAdvisor
+    from src.dataproc.accounts import AccountsDB
+    from src.dataproc.myvideo import MyVideo
+
+
+    def index_advisor(as_json: bool = False) -> str:
+        tables = [MyVideo._TABLE_NAME, MyVideo._EVENTS_TABLE_NAME, MyVideo._STATUS_COUNTS_TABLE_NAME, MyVideo._EVENT_COUNTS_TABLE_NAME,
+                  MyVideo._QUEUE_TABLE_NAME, MyVideo._POST_DAYS_TABLE_NAME, MyVideo._POST_DAY_COUNTS_TABLE_NAME, AccountsDB._TABLE_NAME]
+        report = IndexAdvisor.report(tables)
+        return json.dumps(report, indent=4, default=str) if as_json else IndexAdvisor.format(report)
+
+
+    if __name__ == '__main__':
+        parser = argparse.ArgumentParser(description='Report unused indexes and sequential scans on the entity tables')
+        parser.add_argument('--json', action='store_true', help='Machine readable output')
+        args = parser.parse_args()
+        print(index_advisor(args.json), end='')
+
+except Exception as e:
+    print(f"ERROR:{e}", end='')
\ No newline at end of file
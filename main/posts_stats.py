@@ -13,49 +13,21 @@ try:
 
     def posts_stats(account: str) -> str:
         existing_account_names = {acc.uniquename for acc in get_accounts()}
-
-        mvs = UListMyVideos.load(('status', 'IN', (UListMyVideos.statuses.READY, UListMyVideos.statuses.DONE)),
-                                **({'account': account} if (account in existing_account_names) else {}))
-        
-        posted_this_month = 0
-        posted_today = 0
+        account = account if (account in existing_account_names) else None
 
         now = utils.datetime.now()
 
-        for mv in mvs:
-            if mv.is_posted:
-                dates = []
-                for d in mv.publication_dates.values():
-                    try:
-                        d = utils.str_to_date(d)
-                    except ValueError:
-                        continue
-                    dates.append(d)
-                if dates:
-                    date = max(dates)
-                    if (date.year == now.year) and (date.month == now.month):
-                        posted_this_month += 1
-                        if date.day == now.day:
-                            posted_today += 1
-
-        # Fetch and sort data
-        mvs_map = {mv: {u.name: mv.get_upload_status(u.name) for u in mv.uploaders}
-                for mv in sorted(mvs.filter_attrs(status=UListMyVideos.statuses.READY), key=lambda mv: utils.str_to_date(mv.id))}
-
-        total_initiated = 0
-
-        non_candidates: list[MyVideo] = []
-        for mv, uss in mvs_map.items():
-            is_candidate = False
-            for us in uss.values():
-                if us == mv.uploadstatuses.INITIATED:
-                    total_initiated += 1
-                    is_candidate = True
-            if not is_candidate:
-                non_candidates.append(mv)
-        
-        for mv in non_candidates:
-            mvs_map.pop(mv)
+        # Counters maintained by the db layer, no scan of the videos
+        posted_days = UListMyVideos.count_posted_days(account=account, since=now.date().replace(day=1))
+        posted_this_month = sum(n for (_, day), n in posted_days.items() if (day.year == now.year) and (day.month == now.month))
+        posted_today = sum(n for (_, day), n in posted_days.items() if day == now.date())
+        total_initiated = sum(UListMyVideos.count_initiated(account=account).values())
+
+        # Only the queued videos are loaded for the details
+        ids = UListMyVideos.next_posts(account=account)
+        mvs = UListMyVideos.load(('id', 'IN', ids)) if ids else UListMyVideos()
+        mvs_map = {mv: uss for mv in sorted(mvs, key=lambda mv: utils.str_to_date(mv.id))
+                   if MyVideo.uploadstatuses.INITIATED in (uss := {u.name: mv.get_upload_status(u.name) for u in mv.uploaders}).values()}
 
         details: dict = {}
         for mv, uss in mvs_map.items():
@@ -87,11 +59,31 @@ Details:
 )}
 """.strip()
 
+    def check_counters(account: str) -> str:
+        existing_account_names = {acc.uniquename for acc in get_accounts()}
+        mismatches = UListMyVideos.check_post_counters(account=account if (account in existing_account_names) else None)
+        lines = [f'  • [{acc}] {day}: {scanned} posted, {counted} counted' for (acc, day), (scanned, counted) in sorted(mismatches['posted_days'].items())]
+        lines += [f'  • [{acc}] INITIATED: {scanned} on drive, {counted} counted' for acc, (scanned, counted) in sorted(mismatches['initiated'].items())]
+        return ('Counters mismatches:' + chr(10) + chr(10).join(lines)) if lines else 'Counters are consistent.'
+
+
+    def rebuild_counters() -> str:
+        UListMyVideos.rebuild_post_counters()
+        return 'Counters rebuilt.'
+
+
     if __name__ == '__main__':
         parser = argparse.ArgumentParser(description='Get video post info from filename.')
         parser.add_argument('account', nargs='?', type=str, default=AUTO, help='(OPTIONAL) Target account')
+        parser.add_argument('--check', action='store_true', help='Compare the counters with a full scan of the videos')
+        parser.add_argument('--rebuild', action='store_true', help='Derive the counters again from the videos')
         args = parser.parse_args()
-        print(posts_stats(args.account), end='')
+        if args.rebuild:
+            print(rebuild_counters(), end='')
+        elif args.check:
+            print(check_counters(args.account), end='')
+        else:
+            print(posts_stats(args.account), end='')
 
 except Exception as e:
     print(f"ERROR:{e}", end='')
@@ -4,10 +4,13 @@ try:
 
     import argparse
 
-    from src.dataproc.myvideo import MyVideo
+    from src.dataproc.journal import Journal, JournalOps
 
 
     def register_post(id: str, platform: str) -> str:    
+        # Imported here, loading MyVideo connects to the db
+        from src.dataproc.myvideo import MyVideo
+
         mv = MyVideo.load(id=id, auto_save=True)
         if mv is None:
             raise ValueError(f'Video with ID "{id}" not found.')
@@ -28,12 +31,19 @@ try:
             return f'Video already registered.'
 
 
+    def queue_register_post(id: str, platform: str) -> str:
+        Journal.record(JournalOps.REGISTER_POST, id, platform)
+        Journal.spawn_flusher()
+        return f'Video registration queued for {id} on {platform.lower()}.'
+
+
     if __name__ == '__main__':
         parser = argparse.ArgumentParser(description='Register a video post URL for a specific platform')
         parser.add_argument('--id', '-i', required=True, help='Video ID')
         parser.add_argument('--platform', '-p', required=True, help='Platform name (e.g., tiktok, youtube)')
+        parser.add_argument('--sync', action='store_true', help='Apply directly on the db instead of queuing in the journal')
         args = parser.parse_args()
-        print(register_post(args.id.replace('"', '').replace("'", "").strip(), args.platform.replace('"', '').replace("'", "").strip()), end='')
+        print((register_post if args.sync else queue_register_post)(args.id.replace('"', '').replace("'", "").strip(), args.platform.replace('"', '').replace("'", "").strip()), end='')
 
 except Exception as e:
     print(f"ERROR:{e}", end='')
\ No newline at end of file
@@ -3,10 +3,13 @@ try:
 
     import argparse
 
-    from src.dataproc.myvideo import MyVideo
+    from src.dataproc.journal import Journal, JournalOps
 
 
     def skip_post(id: str, platform: str) -> str:    
+        # Imported here, loading MyVideo connects to the db
+        from src.dataproc.myvideo import MyVideo
+
         mv = MyVideo.load(id=id, auto_save=True)
         if mv is None:
             raise ValueError(f'Video with ID "{id}" not found.')
@@ -27,12 +30,19 @@ try:
             return f'Video successfully skipped but {mv} was already setted as posted for this platform ({platform}).'
 
 
+    def queue_skip_post(id: str, platform: str) -> str:
+        Journal.record(JournalOps.SKIP_POST, id, platform)
+        Journal.spawn_flusher()
+        return f'Video skip queued for {id} on {platform.lower()}.'
+
+
     if __name__ == '__main__':
         parser = argparse.ArgumentParser(description='Register a video post URL for a specific platform')
         parser.add_argument('--id', '-i', required=True, help='Video ID')
         parser.add_argument('--platform', '-p', required=True, help='Platform name (e.g., tiktok, youtube)')
+        parser.add_argument('--sync', action='store_true', help='Apply directly on the db instead of queuing in the journal')
         args = parser.parse_args()
-        print(skip_post(args.id.replace('"', '').replace("'", "").strip(), args.platform.replace('"', '').replace("'", "").strip()), end='')
+        print((skip_post if args.sync else queue_skip_post)(args.id.replace('"', '').replace("'", "").strip(), args.platform.replace('"', '').replace("'", "").strip()), end='')
 
 except Exception as e:
     print(f"ERROR:{e}", end='')
\ No newline at end of file
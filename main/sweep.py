@@ -0,0 +1,32 @@
+try:
+    from _b import *
+
+    import argparse
+
+    from src.dataproc.myvideo import UListMyVideos
+
+
+    def sweep(dry_run: bool = False, verbose: bool = False) -> str:
+        mvs = UListMyVideos.load(('status', 'IN', UListMyVideos._SWEPT_STATUSES))
+        total = len(mvs)
+
+        def progress(stage: str, done: int, total: int) -> None:
+            if verbose and ((done == total) or (done % 100 == 0)):
+                print(f'{stage}: {done}/{total}')
+
+        swept = mvs.sweep(dry_run=dry_run, progress=progress)
+        result = f'{len(swept)}/{total} videos {"to sweep" if dry_run else "swept"}.'
+        if dry_run:
+            result += ''.join(f'\n  • {mv.id} ({mv.status.name})' for mv in swept)
+        return result
+
+
+    if __name__ == '__main__':
+        parser = argparse.ArgumentParser(description='Delete in bulk the BANNED videos and the DONE videos posted more than a month ago')
+        parser.add_argument('--dry-run', '-n', action='store_true', help='Only list the videos that would be deleted')
+        parser.add_argument('--verbose', '-v', action='store_true', help='Report the progress of each stage')
+        args = parser.parse_args()
+        print(sweep(args.dry_run, args.verbose), end='')
+
+except Exception as e:
+    print(f"ERROR:{e}", end='')
@@ -1,6 +1,10 @@
 import asyncio
+import json
+import typing as ty
 
+import requests
 from mega import Mega
+from mega.errors import RequestError
 
 from src.modules.paths import Path, PathLike
 from src.modules.files import generate_random_path, TempDir
@@ -16,6 +20,7 @@ class MegaCloud:
 
     logger = Logger('[MegaCloud]')
     ROOT_NAME = 'Cloud Drive'
+    COMMANDS_PER_REQUEST = 100
 
     def __init__(self, account_uniquename: str | None = None):
         self.account = auth.ACCOUNT
@@ -60,29 +65,35 @@ class MegaCloud:
             return None
 
         self.login()
-
+        return self._find(self.user.get_files(), cloud_path)
+
+    @staticmethod
+    def _index(files: dict) -> tuple[dict[str, dict], dict[tuple[str, str], dict]]:
+        """(name -> first node, (parent handle, name) -> node) maps of a fetched file tree, built in one pass."""
+        by_name: dict[str, dict] = {}
+        by_parent: dict[tuple[str, str], dict] = {}
+        for f in files.values():
+            name = f['a'].get('n')
+            by_name.setdefault(name, f)
+            by_parent.setdefault((f['p'], name), f)
+        return by_name, by_parent
+
+    def _find(self, files: dict, cloud_path: PathLike, index: tuple[dict, dict] | None = None) -> dict | None:
+        """Looks `cloud_path` up in an already fetched file tree, pass its `_index` to look several paths up."""
+        by_name, by_parent = index or self._index(files)
         cloud_path = Path(cloud_path).relative
         components = cloud_path.split_components()
 
         if len(components) == 1:
             components.insert(0, self.ROOT_NAME)
 
-        files = self.user.get_files()
-        current_folder_id = None
-
-        for component in components[:-1]:
-            folder = next((f for f in files.values() if f['a'].get('n') == component and 
-                         (current_folder_id is None or f['p'] == current_folder_id)), None)
-            if not folder:
+        # The first component is matched anywhere in the tree, the others under the previous one
+        node = by_name.get(components[0])
+        for component in components[1:]:
+            if node is None:
                 return None
-            current_folder_id = folder['h']
-
-        filename = components[-1]
-        for file in files.values():
-            if (current_folder_id is None or file['p'] == current_folder_id) and file['a'].get('n') == filename:
-                return file
-
-        return None
+            node = by_parent.get((node['h'], component))
+        return node
 
     def exists(self, cloud_path: PathLike):
         """
@@ -383,6 +394,82 @@ class MegaCloud:
         del_func(f['h'])
         self.logger.info(f'Deleted: {cloud_path}')
 
+    def delete_many(self,
+        cloud_paths: ty.Iterable[PathLike],
+        send_to_trash: bool = True,
+        skip_errors: bool = False
+    ) -> list[PathLike]:
+        """
+        Deletes several files/folders with a single fetch of the file tree.
+
+        :param cloud_paths: Paths to delete
+        :param send_to_trash: Move to the Mega trash bin instead of destroying
+        :param skip_errors: Skip missing paths and failed deletions instead of raising
+        :return: The paths that were deleted
+        """
+        self.login()
+
+        files = self.user.get_files()
+        index = self._index(files)
+        found: dict[str, PathLike] = {}
+        for cloud_path in cloud_paths:
+            f = self._find(files, cloud_path, index) if cloud_path else None
+            if f is None:
+                if not skip_errors:
+                    raise FileNotFoundError(f'Cloud file not found: {cloud_path}')
+                self.logger.warning(f'Failed to delete {cloud_path}: File not found.')
+                continue
+            found.setdefault(f['h'], cloud_path)
+
+        if not found:
+            return []
+
+        if send_to_trash:
+            trash_id = next(h for h, f in files.items() if f['t'] == 4)
+            command = lambda h: {'a': 'm', 'n': h, 't': trash_id}
+        else:
+            command = lambda h: {'a': 'd', 'n': h}
+
+        handles = list(found)
+        deleted: list[PathLike] = []
+        errors: list[RequestError] = []
+        for i in range(0, len(handles), self.COMMANDS_PER_REQUEST):
+            chunk = handles[i:i + self.COMMANDS_PER_REQUEST]
+            for h, result in zip(chunk, self._api_batch([command(h) for h in chunk])):
+                if isinstance(result, int) and result < 0:
+                    error = RequestError(result)
+                    self.logger.warning(f'Failed to delete {found[h]}: {error}')
+                    errors.append(error)
+                else:
+                    deleted.append(found[h])
+
+        self.logger.info(f'Deleted {len(deleted)} cloud paths')
+        if errors and not skip_errors:
+            raise errors[0]
+        return deleted
+
+    def _api_batch(self, commands: list[dict]) -> list:
+        """
+        Sends several commands in a single API request and returns the result of each one.
+        mega.py only returns the first result of a request, so this is the one place relying on its internals.
+        """
+        user = self.user
+        params = {'id': user.sequence_num}
+        user.sequence_num += 1
+        if user.sid:
+            params['sid'] = user.sid
+
+        response = requests.post(
+            f'{user.schema}://g.api.{user.domain}/cs',
+            params=params,
+            data=json.dumps([{**c, 'i': user.request_id} for c in commands]),
+            timeout=user.timeout
+        )
+        results = json.loads(response.text)
+        if isinstance(results, int):
+            raise RequestError(results)
+        return results
+
     def __enter__(self):
         self.login()
         return self
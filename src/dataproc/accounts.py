@@ -1,6 +1,11 @@
+import typing as ty
+
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from types import MappingProxyType
 
-from src.dataproc.com import _DB
+from src.config import VideoFFMPEGBuilder
+from src.dataproc.com import _DB, _is_transient_error
 from src.exceptions import AccountNotFoundError
 
 
@@ -27,6 +32,51 @@ class Account:
         self.platforms = [p.lower() for p in self.platforms if p.lower() in ALL_PLATFORMS]
 
 
+@dataclass(frozen=True)
+class PlatformRegistry:
+    """Platforms of the loaded accounts, the same object until the accounts change."""
+    order: tuple[str, ...]
+    """The platforms, in accounts order"""
+    names: frozenset[str]
+    """The platforms, for membership tests"""
+    extensions: ty.Mapping[str, str]
+    """Extension of the converted video of each platform having ffmpeg options"""
+
+    @classmethod
+    def from_platforms(cls, platforms: ty.Iterable[str]) -> 'PlatformRegistry':
+        order = tuple(platforms)
+        return cls(
+            order=order,
+            names=frozenset(order),
+            extensions=MappingProxyType({p: VideoFFMPEGBuilder.OPTIONS[p]['extension'] for p in order if p in VideoFFMPEGBuilder.OPTIONS})
+        )
+
+    def check(self, platform: str) -> str:
+        """Lower cased `platform`, which must be a platform of the accounts."""
+        platform = platform.lower()
+        assert platform in self.names, f'Invalid platform: {platform}'
+        return platform
+
+    def post_filename(self, platform: str, account: str, id: str) -> str:
+        return f"{platform}={account}={id}{self.extensions[platform]}"
+
+    def __contains__(self, platform: str) -> bool:
+        return platform in self.names
+
+    def __iter__(self) -> ty.Iterator[str]:
+        return iter(self.order)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+
+def _parse_platforms(platforms: list[str] | str | None) -> list[str]:
+    # Comma joined TEXT before the TEXT[] migration
+    if isinstance(platforms, str):
+        return platforms.split(',') if platforms else []
+    return list(platforms or [])
+
+
 class AccountsDB(_DB):
     _TABLE_NAME = 'accounts'
     
@@ -38,8 +88,8 @@ class AccountsDB(_DB):
         columns = [description[0] for description in cls._cursor.description]
         params = [dict(zip(columns, row)) for row in rows]
         for r in params:
-            if 'platforms' in r and isinstance(r['platforms'], str):
-                r['platforms'] = r['platforms'].split(',') if r['platforms'] else []
+            if 'platforms' in r:
+                r['platforms'] = _parse_platforms(r['platforms'])
         return [Account(**r) for r in params]
     
     @classmethod
@@ -50,11 +100,49 @@ class AccountsDB(_DB):
                 uniquename VARCHAR(255) PRIMARY KEY,
                 name VARCHAR(255) NOT NULL,
                 email VARCHAR(255) NOT NULL,
-                platforms TEXT NOT NULL,
+                platforms TEXT[] NOT NULL DEFAULT '{{}}',
                 metadata VARCHAR(255)
             );
         ''')
+
+        cls._cursor.execute('''
+            SELECT data_type FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = %s AND column_name = 'platforms';
+        ''', (cls._TABLE_NAME,))
+        if cls._cursor.fetchone()[0] != 'ARRAY':
+            # Platforms used to be stored as a comma joined TEXT
+            cls._cursor.execute(f'''
+                ALTER TABLE "{cls._TABLE_NAME}"
+                    ALTER COLUMN platforms TYPE TEXT[]
+                        USING (CASE WHEN platforms = '' THEN '{{}}'::TEXT[] ELSE string_to_array(platforms, ',') END),
+                    ALTER COLUMN platforms SET DEFAULT '{{}}';
+            ''')
+            cls.logger.info(f'{cls._TABLE_NAME}.platforms migrated to TEXT[].')
         cls._db.commit()
+
+    @classmethod
+    def create_indexs(cls) -> None:
+        cls.connect()
+        cls._cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_accounts_platforms ON "{cls._TABLE_NAME}" USING GIN (platforms);')
+        cls._db.commit()
+
+    @classmethod
+    def accounts_for_platform(cls, platform: str) -> list[str]:
+        """Uniquenames of the accounts publishing on `platform`, answered by the GIN index."""
+        cls.connect()
+        cls._cursor.execute(
+            f'SELECT uniquename FROM "{cls._TABLE_NAME}" WHERE platforms @> ARRAY[%s]::TEXT[]', (platform.lower(),)
+        )
+        return [row[0] for row in cls._cursor.fetchall()]
+
+    @classmethod
+    def platforms_for_account(cls, uniquename: str) -> list[str]:
+        cls.connect()
+        cls._cursor.execute(f'SELECT platforms FROM "{cls._TABLE_NAME}" WHERE uniquename = %s', (uniquename,))
+        row = cls._cursor.fetchone()
+        if row is None:
+            raise AccountNotFoundError(f"Account with uniquename '{uniquename}' not found.")
+        return _parse_platforms(row[0])
         
     @classmethod
     def account_exists(cls, uniquename: str) -> bool:
@@ -74,8 +162,8 @@ class AccountsDB(_DB):
             platforms = []
         cls.connect()
         cls._cursor.execute(
-            f'INSERT INTO "{cls._TABLE_NAME}" (uniquename, name, email, platforms, metadata) VALUES (%s, %s, %s, %s, %s)',
-            (uniquename, name, email, ','.join(platforms), metadata)
+            f'INSERT INTO "{cls._TABLE_NAME}" (uniquename, name, email, platforms, metadata) VALUES (%s, %s, %s, %s::TEXT[], %s)',
+            (uniquename, name, email, list(platforms), metadata)
         )
         cls._db.commit()
         return Account(uniquename, name, email, platforms, metadata)
@@ -86,12 +174,141 @@ class AccountsDB(_DB):
         cls._cursor.execute(f'DELETE FROM "{cls._TABLE_NAME}" WHERE uniquename = %s', (uniquename,))
         cls._db.commit()
 
-def get_accounts() -> list[Account]:
+class AccountRotation(_DB):
+    """Weighted account rotation shared through the database (stride scheduling: the smallest `pass` is next)."""
+
+    _TABLE_NAME = 'account_rotation'
+    STRIDE = 1_000_000
+    DEFAULT_WEIGHT = 1
+
+    @classmethod
+    def create_table(cls) -> None:
+        cls.connect()
+        cls._cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS "{cls._TABLE_NAME}" (
+                uniquename VARCHAR(255) PRIMARY KEY,
+                weight INTEGER NOT NULL DEFAULT {cls.DEFAULT_WEIGHT} CHECK (weight > 0),
+                pass BIGINT NOT NULL DEFAULT 0,
+                selections BIGINT NOT NULL DEFAULT 0
+            );
+        ''')
+        cls._db.commit()
+
+    @classmethod
+    def create_indexs(cls) -> None:
+        cls.connect()
+        cls._cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_rotation_pass ON "{cls._TABLE_NAME}" (pass, uniquename);')
+        cls._db.commit()
+
+    @classmethod
+    def _register(cls, uniquenames: list[str]) -> None:
+        # Newcomers start at the current minimum pass, they don't get to catch up with the others
+        cls._cursor.execute(f'''
+            INSERT INTO "{cls._TABLE_NAME}" (uniquename, pass)
+            SELECT u, COALESCE((SELECT min(pass) FROM "{cls._TABLE_NAME}"), 0) FROM unnest(%s::TEXT[]) AS u
+            ON CONFLICT (uniquename) DO NOTHING;
+        ''', (uniquenames,))
+
+    @classmethod
+    def claim_next(cls, uniquenames: list[str]) -> str | None:
+        """Selects the next account among `uniquenames`, None when all of them are being claimed."""
+        cls.connect()
+        cls._register(uniquenames)
+        cls._cursor.execute(f'''
+            UPDATE "{cls._TABLE_NAME}" r SET pass = r.pass + %s / r.weight, selections = r.selections + 1
+            WHERE r.uniquename = (
+                SELECT uniquename FROM "{cls._TABLE_NAME}" WHERE uniquename = ANY(%s::TEXT[])
+                ORDER BY pass, uniquename LIMIT 1 FOR UPDATE SKIP LOCKED
+            )
+            RETURNING r.uniquename;
+        ''', (cls.STRIDE, uniquenames))
+        row = cls._cursor.fetchone()
+        cls._db.commit()
+        return None if row is None else row[0]
+
+    @classmethod
+    def claim(cls, uniquename: str) -> None:
+        """Counts an explicit selection of `uniquename` in the rotation."""
+        cls.connect()
+        cls._register([uniquename])
+        cls._cursor.execute(f'''
+            UPDATE "{cls._TABLE_NAME}" SET pass = pass + %s / weight, selections = selections + 1
+            WHERE uniquename = %s;
+        ''', (cls.STRIDE, uniquename))
+        cls._db.commit()
+
+    @classmethod
+    def set_weight(cls, uniquename: str, weight: int) -> None:
+        cls.connect()
+        cls._register([uniquename])
+        cls._cursor.execute(f'UPDATE "{cls._TABLE_NAME}" SET weight = %s WHERE uniquename = %s', (weight, uniquename))
+        cls._db.commit()
+
+    @classmethod
+    def forget(cls, uniquename: str) -> None:
+        cls.connect()
+        cls._cursor.execute(f'DELETE FROM "{cls._TABLE_NAME}" WHERE uniquename = %s', (uniquename,))
+        cls._db.commit()
+
+
+def _loaded_accounts() -> list[Account]:
     global _accounts
     if _accounts is None:
         _accounts = AccountsDB.load_accounts()
+        _accounts_updated()
     return _accounts
 
+def get_accounts() -> list[Account]:
+    """The accounts, in rotation order (the next selected account first)."""
+    global _rotated, _rotation
+    accounts = _loaded_accounts()
+    if _rotated:
+        # Selections only move the rotation entries, the accounts take their order on the next read
+        _rotated = False
+        order = _rotation_order()
+        accounts[:] = order.values()
+        _accounts_updated()
+        _rotation = (_accounts_generation, order)
+    return accounts
+
+def _accounts_updated(*changed: str) -> None:
+    """Must follow every change of `_accounts`, listeners get the `changed` accounts."""
+    global _accounts_generation
+    _accounts_generation += 1
+    if changed:
+        for listener in _listeners:
+            listener(list(changed))
+
+def on_accounts_changed(listener: ty.Callable[[list[str]], None]) -> None:
+    """Registers `listener(uniquenames)`, called once accounts were added, updated or deleted."""
+    _listeners.append(listener)
+
+def get_accounts_generation() -> int:
+    get_accounts()
+    return _accounts_generation
+
+def _platform_index() -> tuple[dict[str, list[Account]], dict[str, list[str]]]:
+    """Bidirectional platform <-> account index of the loaded accounts, in accounts order."""
+    global _index
+    accounts = get_accounts()
+    if _index is None or _index[0] != _accounts_generation:
+        by_platform: dict[str, list[Account]] = {}
+        for a in accounts:
+            for p in a.platforms:
+                by_platform.setdefault(p, []).append(a)
+        by_account = {a.uniquename: list(a.platforms) for a in accounts}
+        _index = (_accounts_generation, by_platform, by_account)
+    return _index[1], _index[2]
+
+def get_platform_accounts(platform: str) -> list[Account]:
+    return list(_platform_index()[0].get(platform.lower(), ()))
+
+def get_account_platforms(uniquename: str) -> list[str]:
+    by_account = _platform_index()[1]
+    if uniquename not in by_account:
+        raise AccountNotFoundError(f"No account found from uniquename '{uniquename}'")
+    return list(by_account[uniquename])
+
 def add_account(
     uniquename: str,
     name: str,
@@ -108,6 +325,7 @@ def add_account(
     if _accounts is None:
         _accounts = []
     _accounts.append(account)
+    _accounts_updated(uniquename)
     return account
 
 def update_account(uniquename: str, name: str | None = None, email: str | None = None, platforms: list[str] | None = None, metadata: str | None = None) -> Account:
@@ -123,8 +341,8 @@ def update_account(uniquename: str, name: str | None = None, email: str | None =
     columns = [description[0] for description in AccountsDB._cursor.description]
     current_data = dict(zip(columns, row))
     
-    if 'platforms' in current_data and isinstance(current_data['platforms'], str):
-        current_data['platforms'] = current_data['platforms'].split(',') if current_data['platforms'] else []
+    if 'platforms' in current_data:
+        current_data['platforms'] = _parse_platforms(current_data['platforms'])
 
     if name is not None:
         current_data['name'] = name
@@ -136,8 +354,8 @@ def update_account(uniquename: str, name: str | None = None, email: str | None =
         current_data['metadata'] = metadata
     
     AccountsDB._cursor.execute(
-        f'UPDATE "{AccountsDB._TABLE_NAME}" SET name = %s, email = %s, platforms = %s, metadata = %s WHERE uniquename = %s',
-        (current_data['name'], current_data['email'], ','.join(current_data['platforms']), current_data['metadata'], uniquename)
+        f'UPDATE "{AccountsDB._TABLE_NAME}" SET name = %s, email = %s, platforms = %s::TEXT[], metadata = %s WHERE uniquename = %s',
+        (current_data['name'], current_data['email'], list(current_data['platforms']), current_data['metadata'], uniquename)
     )
     AccountsDB._db.commit()
     
@@ -153,35 +371,82 @@ def update_account(uniquename: str, name: str | None = None, email: str | None =
             if account.uniquename == uniquename:
                 _accounts[i] = updated_account
                 break
+    _accounts_updated(uniquename)
     
     return updated_account
 
 def delete_account(uniquename: str) -> None:
     global _accounts
     AccountsDB.delete_account(uniquename)
+    AccountRotation.forget(uniquename)
     if _accounts:
         _accounts[:] = [a for a in _accounts if a.uniquename != uniquename]
+    _accounts_updated(uniquename)
 
-def select_account(uniquename: str | None = None) -> Account:
-    assert _accounts, 'Can not select account from empty list.'
-    if uniquename is None:
-        account = _accounts[0]
-        rotate_account(account)
-        return account
-    else:
-        for account in _accounts:
-            if account.uniquename == uniquename:
-                rotate_account(account)
-                return account
+def _rotation_order() -> OrderedDict[str, Account]:
+    """Local rotation order, next account first."""
+    global _rotation
+    accounts = _loaded_accounts()
+    if _rotation is None or _rotation[0] != _accounts_generation:
+        by_name = {a.uniquename: a for a in accounts}
+        # Accounts kept across reloads keep their place in the rotation
+        order = OrderedDict((n, by_name[n]) for n in (_rotation[1] if _rotation else ()) if n in by_name)
+        for a in accounts:
+            order.setdefault(a.uniquename, a)
+        _rotation = (_accounts_generation, order)
+    return _rotation[1]
+
+def select_account(uniquename: str | None = None, persist: bool = False) -> Account:
+    """Selects `uniquename` or the next account, from the shared rotation with `persist` when the database is reachable."""
+    global _rotated
+    order = _rotation_order()
+    assert order, 'Can not select account from empty list.'
+    if uniquename is not None and uniquename not in order:
         raise AccountNotFoundError(f"No account found from uniquename '{uniquename}'")
+    if persist:
+        try:
+            if uniquename is None:
+                uniquename = AccountRotation.claim_next(list(order))
+            else:
+                AccountRotation.claim(uniquename)
+        except Exception as e:
+            if not _is_transient_error(e):
+                raise
+            AccountRotation.logger.warning(f'Shared rotation unreachable, local rotation used: {e}')
+    if uniquename is None:
+        uniquename = next(iter(order))
+
+    order.move_to_end(uniquename)
+    _rotated = True
+    return order[uniquename]
 
 def rotate_account(old_account: Account) -> None:
-    _accounts.remove(old_account)
-    _accounts.append(old_account)
+    global _rotated
+    _rotation_order().move_to_end(old_account.uniquename)
+    _rotated = True
+
+def set_account_weight(uniquename: str, weight: int) -> None:
+    """Relative share of the selections of `uniquename` in the persistent rotation."""
+    if uniquename not in _rotation_order():
+        raise AccountNotFoundError(f"No account found from uniquename '{uniquename}'")
+    AccountRotation.set_weight(uniquename, weight)
+
+def get_platform_registry() -> PlatformRegistry:
+    """Cached until the accounts change."""
+    global _registry
+    get_accounts()
+    if _registry is None or _registry[0] != _accounts_generation:
+        _registry = (_accounts_generation, PlatformRegistry.from_platforms(_platform_index()[0]))
+    return _registry[1]
 
 def get_platforms() -> list[str]:
-    accounts = get_accounts()
-    return list({p for a in accounts for p in a.platforms})
+    return list(get_platform_registry())
 
 
-_accounts: list[Account] | None = None
\ No newline at end of file
+_accounts: list[Account] | None = None
+_accounts_generation: int = 0
+_index: tuple[int, dict[str, list[Account]], dict[str, list[str]]] | None = None
+_rotation: tuple[int, OrderedDict[str, Account]] | None = None
+_rotated: bool = False
+_registry: tuple[int, PlatformRegistry] | None = None
+_listeners: list[ty.Callable[[list[str]], None]] = []
\ No newline at end of file
@@ -0,0 +1,120 @@
+import pg8000 as sq
+
+from src.modules.display import Logger
+
+from src.dataproc.com import _DB
+
+
+class IndexAdvisor(_DB):
+    """Unused indexes, sequential scans and expensive statements of the entity tables, from the db statistics."""
+
+    logger = Logger('[IndexAdvisor]')
+    SEQ_SCAN_MIN_ROWS = 1000    # Sequential scans on smaller tables are cheaper than an index
+    TOP_STATEMENTS = 10
+    # Each requested table and its partitions (at any depth), with the name of the requested table
+    _RELATIONS = '''
+        rels(relid, parent) AS (
+            SELECT c.oid, c.relname::text FROM pg_class c WHERE c.relname = ANY($1) AND c.relkind IN ('r', 'p')
+            UNION ALL
+            SELECT h.inhrelid, r.parent FROM pg_inherits h JOIN rels r ON h.inhparent = r.relid
+        )'''
+
+    @classmethod
+    def _fetch(cls, query: str, params: tuple = ()) -> list[dict]:
+        _DB._cursor.execute(query, params)
+        columns = [description[0] for description in _DB._cursor.description]
+        return [dict(zip(columns, row)) for row in _DB._cursor.fetchall()]
+
+    @classmethod
+    def unused_indexes(cls, tables: list[str]) -> list[dict]:
+        # An index of a partitioned table is scanned through the indexes of its partitions
+        return cls._fetch(f'''
+            WITH RECURSIVE {cls._RELATIONS},
+            idx(indexrelid, root) AS (
+                SELECT i.indexrelid, i.indexrelid FROM pg_index i JOIN rels r ON r.relid = i.indrelid
+                WHERE NOT EXISTS (SELECT 1 FROM pg_inherits h WHERE h.inhrelid = i.indexrelid)
+                UNION ALL
+                SELECT h.inhrelid, x.root FROM pg_inherits h JOIN idx x ON h.inhparent = x.indexrelid
+            )
+            SELECT r.parent AS "table", c.relname AS "index", sum(s.idx_scan) AS scans,
+                sum(pg_relation_size(s.indexrelid)) AS size
+            FROM idx x
+                JOIN pg_stat_user_indexes s ON s.indexrelid = x.indexrelid
+                JOIN pg_index i ON i.indexrelid = x.root
+                JOIN pg_class c ON c.oid = x.root
+                JOIN rels r ON r.relid = i.indrelid
+            WHERE NOT i.indisunique
+            GROUP BY r.parent, c.relname
+            HAVING sum(s.idx_scan) = 0
+            ORDER BY size DESC;
+        ''', (tables,))
+
+    @classmethod
+    def seq_scans(cls, tables: list[str]) -> list[dict]:
+        return cls._fetch(f'''
+            WITH RECURSIVE {cls._RELATIONS}
+            SELECT r.parent AS "table", sum(s.seq_scan) AS seq_scan, sum(s.seq_tup_read) AS seq_tup_read,
+                sum(COALESCE(s.idx_scan, 0)) AS idx_scan, sum(s.n_live_tup) AS rows
+            FROM pg_stat_user_tables s JOIN rels r ON r.relid = s.relid
+            GROUP BY r.parent
+            HAVING sum(s.seq_scan) > sum(COALESCE(s.idx_scan, 0)) AND sum(s.n_live_tup) >= $2
+            ORDER BY seq_tup_read DESC;
+        ''', (tables, cls.SEQ_SCAN_MIN_ROWS))
+
+    @classmethod
+    def top_statements(cls, tables: list[str]) -> list[dict] | None:
+        """None when pg_stat_statements is not installed on the database."""
+        _DB._cursor.execute('''SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements';''')
+        if _DB._cursor.fetchone() is None:
+            return None
+
+        patterns = [f'%"{t}"%' for t in tables] + [f'% {t} %' for t in tables]
+        # Timing columns were renamed in PostgreSQL 13
+        for total, mean in (('total_exec_time', 'mean_exec_time'), ('total_time', 'mean_time')):
+            try:
+                return cls._fetch(f'''
+                    SELECT query, calls, round({total}::numeric, 1) AS total_ms, round({mean}::numeric, 3) AS mean_ms, rows
+                    FROM pg_stat_statements
+                    WHERE query ILIKE ANY($1)
+                    ORDER BY {total} DESC
+                    LIMIT $2;
+                ''', (patterns, cls.TOP_STATEMENTS))
+            except sq.DatabaseError:
+                _DB._db.rollback()
+        return None
+
+    @classmethod
+    def report(cls, tables: list[str]) -> dict:
+        cls.connect()
+        try:
+            stats_reset = cls._fetch('''SELECT stats_reset FROM pg_stat_database WHERE datname = current_database();''')
+            report = {
+                'stats_reset': str(stats_reset[0]['stats_reset']) if stats_reset else None,
+                'unused_indexes': cls.unused_indexes(tables),
+                'seq_scans': cls.seq_scans(tables),
+                'top_statements': cls.top_statements(tables)
+            }
+        finally:
+            # Read only, nothing to keep from this transaction
+            _DB._db.rollback()
+        cls.logger.info(f'Index report built for: {", ".join(tables)}')
+        return report
+
+    @classmethod
+    def format(cls, report: dict) -> str:
+        lines = ['### Index Advisor ###', '', f'Stats since: {report["stats_reset"] or "database creation"}', '']
+
+        lines.append('Unused indexes (candidates for removal):')
+        lines += [f'  • {r["table"]}.{r["index"]} ({r["size"] // 1024} KiB)' for r in report['unused_indexes']] or ['  • None']
+
+        lines += ['', 'Sequential scans dominating index scans:']
+        lines += [f'  • {r["table"]}: {r["seq_scan"]} seq scans ({r["seq_tup_read"]} rows read) vs {r["idx_scan"]} index scans, {r["rows"]} rows'
+                  for r in report['seq_scans']] or ['  • None']
+
+        lines += ['', 'Most expensive statements:']
+        if report['top_statements'] is None:
+            lines.append('  • pg_stat_statements is not installed (CREATE EXTENSION pg_stat_statements, needs shared_preload_libraries)')
+        else:
+            lines += [f'  • {r["total_ms"]} ms total, {r["calls"]} calls, {r["mean_ms"]} ms mean: {" ".join(r["query"].split())[:200]}'
+                      for r in report['top_statements']] or ['  • None']
+        return '\n'.join(lines)
@@ -0,0 +1,138 @@
+import typing as ty
+
+from array import array
+from collections import Counter
+from enum import Enum
+from itertools import compress
+
+
+def _typecode(n_values: int) -> str:
+    return 'B' if n_values <= 0xFF else 'H' if n_values <= 0xFFFF else 'I'
+
+
+class ColumnStore:
+    """Read-only, column-oriented view of entity rows, `_SNAPSHOT_DICT_COLUMNS` are encoded as integer codes."""
+
+    def __init__(self, ecls: type, columns: list[str], rows: list[ty.Sequence]) -> None:
+        self._E = ecls
+        self._columns = list(columns)
+        self._positions = {c: i for i, c in enumerate(self._columns)}
+        self._rows = rows
+        self._selection: array | None = None    # Surviving row indices, None for every row
+        self._values: dict[str, list] = {}
+        self._codes: dict[str, array] = {}
+
+        for name in ecls._SNAPSHOT_DICT_COLUMNS:
+            name = name.lower()
+            if name not in self._positions:
+                continue
+            pos = self._positions[name]
+            index: dict[ty.Any, int] = {}
+            codes = [index.setdefault(row[pos], len(index)) for row in rows]
+            self._values[name] = list(index)
+            self._codes[name] = array(_typecode(len(index)), codes)
+
+    @classmethod
+    def from_objects(cls, ecls: type, objs: ty.Iterable) -> 'ColumnStore':
+        """Store over already built objects, one attribute read per object and column."""
+        from src import utils
+
+        keys = ['id', *ecls._sdata]
+        rows = []
+        for obj in objs:
+            row = utils.build_sql_json_row(obj)
+            rows.append(tuple(row[k.lower()] for k in keys))
+        return cls(ecls, [k.lower() for k in keys], rows)
+
+    def _derive(self, selection: ty.Iterable[int]) -> 'ColumnStore':
+        store = object.__new__(ColumnStore)
+        store.__dict__.update(self.__dict__)
+        store._selection = array(_typecode(len(self._rows)), selection)
+        return store
+
+    def _indices(self) -> ty.Iterable[int]:
+        return range(len(self._rows)) if self._selection is None else self._selection
+
+    def _position(self, name: str) -> int:
+        name = name.lower()
+        if name not in self._positions:
+            raise KeyError(f'Unknown column: {name}')
+        return self._positions[name]
+
+    @staticmethod
+    def _raw(value: ty.Any) -> ty.Any:
+        return value.value if isinstance(value, Enum) else value
+
+    def _mask(self, name: str, value: ty.Any) -> ty.Iterator[bool]:
+        """One boolean per selected row, `value` may be a single value or a list/tuple/set of values."""
+        name = name.lower()
+        wanted = [self._raw(v) for v in value] if isinstance(value, (list, tuple, set, frozenset)) else [self._raw(value)]
+
+        if name in self._codes:
+            codes = {i for i, v in enumerate(self._values[name]) if v in wanted}
+            column = self._codes[name]
+            selected = column if self._selection is None else map(column.__getitem__, self._selection)
+            return map(codes.__contains__, selected)
+
+        pos = self._position(name)
+        return (self._rows[i][pos] in wanted for i in self._indices())
+
+    def filter(self, **attrs) -> 'ColumnStore':
+        """Rows whose columns equal (or are in, for list/tuple/set values) every given value."""
+        store = self
+        for name, value in attrs.items():
+            store = self._derive(compress(store._indices(), store._mask(name, value)))
+        return store
+
+    def column(self, name: str) -> list:
+        name = name.lower()
+        if name in self._codes:
+            values = self._values[name]
+            column = self._codes[name]
+            return [values[column[i]] for i in self._indices()]
+        pos = self._position(name)
+        return [self._rows[i][pos] for i in self._indices()]
+
+    @property
+    def ids(self) -> list[str]:
+        return self.column('id')
+
+    def count(self, name: str) -> Counter:
+        """Number of selected rows per value of a column."""
+        name = name.lower()
+        if name in self._codes:
+            column = self._codes[name]
+            codes = Counter(column if self._selection is None else map(column.__getitem__, self._selection))
+            values = self._values[name]
+            return Counter({values[code]: n for code, n in codes.items()})
+        return Counter(self.column(name))
+
+    def group(self, name: str) -> dict[ty.Any, 'ColumnStore']:
+        """Selected rows split per value of a column."""
+        name = name.lower()
+        groups: dict[ty.Any, list[int]] = {}
+        if name in self._codes:
+            column = self._codes[name]
+            by_code: dict[int, list[int]] = {}
+            for i in self._indices():
+                by_code.setdefault(column[i], []).append(i)
+            groups = {self._values[name][code]: indices for code, indices in by_code.items()}
+        else:
+            pos = self._position(name)
+            for i in self._indices():
+                groups.setdefault(self._rows[i][pos], []).append(i)
+        return {value: self._derive(indices) for value, indices in groups.items()}
+
+    def materialize(self, auto_save: bool = False, auto_delete: bool = False):
+        """Entity list of the selected rows only."""
+        return self._E._ES(self._E._from_row(self._columns, self._rows[i], auto_save=auto_save, auto_delete=auto_delete)
+                           for i in self._indices())
+
+    def __len__(self) -> int:
+        return len(self._rows) if self._selection is None else len(self._selection)
+
+    def __str__(self) -> str:
+        return f'{self.__class__.__name__}({self._E.__name__}, rows={len(self)})'
+
+    def __repr__(self) -> str:
+        return self.__str__()
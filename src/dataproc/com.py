@@ -1,8 +1,14 @@
+import asyncio
+import json
+import queue
+import threading
 import typing as ty
 import pg8000 as sq
 
 from atexit import register
-from time import sleep
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep, monotonic
 from datetime import datetime
 from enum import Enum
 
@@ -12,7 +18,9 @@ from src.modules.basics.ulist import UList
 
 from src.config import Paths
 from src import utils
-from src.exceptions import ConfigError
+from src.dataproc.snapshot import Snapshot
+from src.dataproc.columns import ColumnStore
+from src.exceptions import ConfigError, DevError
 
 
 T = ty.TypeVar('T', bound='_Com')
@@ -41,57 +49,65 @@ class DBContext:
 class _DB:
     _db: sq.Connection | None = None
     _cursor: sq.Cursor | None = None
+    _initialized: set[str] = set()
     logger = Logger('[DB]')
     
     @classmethod
     def connect(cls) -> None:
         if not getattr(_DB, '_db', None):
-            user = Paths.getenv('DB_USER')
-            if user is None:
-                raise ConfigError('Missing db user')
-            host = Paths.getenv('DB_HOST')
-            if host is None:
-                raise ConfigError('Missing db host')
-            database = Paths.getenv('DB_DATABASE')
-            if database is None:
-                raise ConfigError('Missing db database')
-            port = Paths.getenv('DB_PORT')
-            if port is None:
-                raise ConfigError('Missing db port')
-            try:
-                port = int(port)
-            except ValueError:
-                raise ConfigError(f'Invalid db port: {port}')
-            password = Paths.getenv('DB_PASSWORD')
-            if password is None:
-                raise ConfigError('Missing db password')
-
-            max_retries = 10
-            for i in range(max_retries):
-                try:
-                    _DB._db = sq.connect(
-                        user=user,
-                        host=host,
-                        database=database,
-                        port=port,
-                        password=password,
-                        timeout=10
-                    )
-                    cls.logger.info('Connection to db successful')
-                    break
-                except sq.InterfaceError as e:
-                    if i == max_retries - 1:
-                        raise
-                    cls.logger.warning(f'Connection to db failed, retrying ({i+1}/{max_retries})')
-                    sleep(1)
+            _DB._db = cls._new_connection()
+            _DB._cursor = _DB._db.cursor()
 
+        elif not getattr(_DB, '_cursor', None):
             _DB._cursor = _DB._db.cursor()
 
+        # The connection is shared, so every table is set up on its own first use
+        table_name = getattr(cls, '_TABLE_NAME', None)
+        if table_name is not None and table_name not in _DB._initialized:
+            _DB._initialized.add(table_name)
             cls.create_table()
             cls.create_indexs()
 
-        elif not getattr(_DB, '_cursor', None):
-            _DB._cursor = _DB._db.cursor()
+    @classmethod
+    def _new_connection(cls) -> sq.Connection:
+        user = Paths.getenv('DB_USER')
+        if user is None:
+            raise ConfigError('Missing db user')
+        host = Paths.getenv('DB_HOST')
+        if host is None:
+            raise ConfigError('Missing db host')
+        database = Paths.getenv('DB_DATABASE')
+        if database is None:
+            raise ConfigError('Missing db database')
+        port = Paths.getenv('DB_PORT')
+        if port is None:
+            raise ConfigError('Missing db port')
+        try:
+            port = int(port)
+        except ValueError:
+            raise ConfigError(f'Invalid db port: {port}')
+        password = Paths.getenv('DB_PASSWORD')
+        if password is None:
+            raise ConfigError('Missing db password')
+
+        max_retries = 10
+        for i in range(max_retries):
+            try:
+                db = sq.connect(
+                    user=user,
+                    host=host,
+                    database=database,
+                    port=port,
+                    password=password,
+                    timeout=10
+                )
+                cls.logger.info('Connection to db successful')
+                return db
+            except sq.InterfaceError as e:
+                if i == max_retries - 1:
+                    raise
+                cls.logger.warning(f'Connection to db failed, retrying ({i+1}/{max_retries})')
+                sleep(1)
 
     @classmethod
     def disconnect(cls) -> None:
@@ -118,11 +134,359 @@ class _DB:
         pass
 
 
+def _is_transient_error(e: Exception) -> bool:
+    """Connection losses, serialization failures and deadlocks are worth retrying."""
+    if isinstance(e, sq.InterfaceError):
+        return True
+    if isinstance(e, sq.DatabaseError) and e.args and isinstance(e.args[0], dict):
+        code = e.args[0].get('C', '')
+        return code in ('40001', '40P01') or code.startswith('08') or code.startswith('57P')
+    return False
+
+
+class _DBPool:
+    """Connections of the async API, each operation runs in a worker thread on its own connection (pg8000 is blocking)."""
+
+    POOL_SIZE = 4
+    _idle: queue.LifoQueue = queue.LifoQueue()
+    _slots = threading.BoundedSemaphore(POOL_SIZE)
+    logger = Logger('[DBPool]')
+
+    @classmethod
+    def _execute(cls, func: ty.Callable[..., ty.Any], *args, **kwargs) -> ty.Any:
+        with cls._slots:
+            try:
+                db = cls._idle.get_nowait()
+            except queue.Empty:
+                db = _DB._new_connection()
+
+            cursor = db.cursor()
+            try:
+                result = func(cursor, *args, **kwargs)
+                db.commit()
+            except Exception as e:
+                try:
+                    db.rollback()
+                except Exception:
+                    pass
+                if isinstance(e, sq.InterfaceError):
+                    # Broken connection, never handed out again
+                    cls._close(db)
+                    db = None
+                raise
+            finally:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+                if db is not None:
+                    cls._idle.put(db)
+        return result
+
+    @classmethod
+    async def prepare(cls, *classes: type) -> None:
+        """Creates the tables of `classes` on their first use, as `_DB.connect` does for the sync API."""
+        for c in classes:
+            if c._TABLE_NAME not in _DB._initialized:
+                await asyncio.to_thread(c.connect)
+
+    @classmethod
+    async def run(cls, func: ty.Callable[..., ty.Any], *args, **kwargs) -> ty.Any:
+        """Runs `func(cursor, *args, **kwargs)` in its own transaction on a pooled connection."""
+        return await asyncio.to_thread(cls._execute, func, *args, **kwargs)
+
+    @staticmethod
+    def _close(db: sq.Connection) -> None:
+        try:
+            db.close()
+        except Exception:
+            pass
+
+    @classmethod
+    def close(cls) -> None:
+        while True:
+            try:
+                cls._close(cls._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+register(_DBPool.close)
+
+
+class QueryCache:
+    """Query results by (table, SQL, params), dropped after `TTL` seconds or once the table generation changes."""
+
+    ENABLED = True
+    TTL = 30.0
+    MAX_ENTRIES = 512
+    _entries: OrderedDict[tuple, tuple[float, int, ty.Any]] = OrderedDict()
+    _generations: dict[str, int] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _generation(cls, ecls: type) -> int:
+        if getattr(ecls, '_db_updated', False):
+            ecls._db_updated = False
+            cls._generations[ecls._TABLE_NAME] = cls._generations.get(ecls._TABLE_NAME, 0) + 1
+        return cls._generations.get(ecls._TABLE_NAME, 0)
+
+    @staticmethod
+    def _key(ecls: type, query: str, params: ty.Sequence) -> tuple:
+        return (ecls._TABLE_NAME, query, json.dumps(list(params), default=str))
+
+    @classmethod
+    def get(cls, ecls: type, query: str, params: ty.Sequence) -> ty.Any | None:
+        if not cls.ENABLED:
+            return None
+        key = cls._key(ecls, query, params)
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                return None
+            expires, generation, result = entry
+            if expires < monotonic() or generation != cls._generation(ecls):
+                del cls._entries[key]
+                return None
+            cls._entries.move_to_end(key)
+            return result
+
+    @classmethod
+    def put(cls, ecls: type, query: str, params: ty.Sequence, result: ty.Any) -> None:
+        if not cls.ENABLED:
+            return
+        key = cls._key(ecls, query, params)
+        with cls._lock:
+            cls._entries[key] = (monotonic() + cls.TTL, cls._generation(ecls), result)
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > cls.MAX_ENTRIES:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def invalidate(cls, table_name: str | None = None) -> None:
+        """Drops the entries of one table, of all tables when `table_name` is None."""
+        with cls._lock:
+            for t in ([table_name] if table_name is not None else list(cls._generations)):
+                cls._generations[t] = cls._generations.get(t, 0) + 1
+            if table_name is None:
+                cls._entries.clear()
+
+
+class EntityCache:
+    """Set of the live entities of a class, indexed by id."""
+
+    def __init__(self) -> None:
+        self._by_id: dict[str, TE] = {}
+
+    def get(self, id: str) -> TE | None:
+        return self._by_id.get(id)
+
+    def add(self, obj: TE) -> None:
+        self._by_id.setdefault(obj.id, obj)
+
+    def discard(self, obj: TE) -> None:
+        self._by_id.pop(obj.id, None)
+
+    def difference_update(self, objs: ty.Iterable[TE]) -> None:
+        for obj in objs:
+            self.discard(obj)
+
+    def clear(self) -> None:
+        self._by_id.clear()
+
+    def __contains__(self, obj: TE) -> bool:
+        return getattr(obj, 'id', None) in self._by_id
+
+    def __iter__(self) -> ty.Iterator[TE]:
+        # Snapshot, entities are added and removed while callers iterate
+        return iter(list(self._by_id.values()))
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+class UnitOfWork:
+    """Pending saves and deletes, flushed in a single transaction by the outermost unit (`with UnitOfWork(): ...`)."""
+
+    _active: 'UnitOfWork | None' = None
+    logger = Logger('[UnitOfWork]')
+    MAX_RETRIES = 3
+    RETRY_DELAY = 1.0
+
+    def __init__(self, batch_size: int | None = None) -> None:
+        self.batch_size = batch_size
+        self._saves: dict[type, dict[str, TE]] = {}
+        self._deletes: dict[type, dict[str, bool]] = {}
+        self._callbacks: list[ty.Callable[[], None]] = []
+        self._outer: UnitOfWork | None = None
+
+    def save(self, objs: ty.Iterable[TE]) -> None:
+        """Registers objects to be inserted or updated."""
+        for obj in objs:
+            self._deletes.get(obj._E, {}).pop(obj.id, None)
+            self._saves.setdefault(obj._E, {})[obj.id] = obj
+
+    def delete(self, objs: ty.Iterable[TE], archive: bool = False) -> None:
+        """Registers objects to be deleted (or archived)."""
+        for obj in objs:
+            self.delete_ids(obj._E, (obj.id,), archive=archive)
+
+    def delete_ids(self, cls: type, ids: ty.Iterable[str], archive: bool = False) -> None:
+        """Registers rows to be deleted (or archived) by id."""
+        cls = cls._E
+        for id in ids:
+            self._saves.get(cls, {}).pop(id, None)
+            self._deletes.setdefault(cls, {})[id] = archive
+
+    def on_commit(self, callback: ty.Callable[[], None]) -> None:
+        """Registers a callback to run once the unit has been committed."""
+        self._callbacks.append(callback)
+
+    def clear(self) -> None:
+        self._saves.clear()
+        self._deletes.clear()
+        self._callbacks.clear()
+
+    @staticmethod
+    def _flush_order(classes: ty.Iterable[type]) -> list[type]:
+        """Sorts entity classes so that a table always comes after the tables it depends on."""
+        by_table = {c._TABLE_NAME: c for c in classes}
+        ordered: list[type] = []
+        visiting: set[type] = set()
+
+        def visit(c: type) -> None:
+            if c in ordered:
+                return
+            if c in visiting:
+                raise DevError(f'Cyclic table dependency on: {c._TABLE_NAME}')
+            visiting.add(c)
+            for table_name in c._DEPENDS_ON:
+                if table_name in by_table:
+                    visit(by_table[table_name])
+            ordered.append(c)
+
+        for c in by_table.values():
+            visit(c)
+        return ordered
+
+    def _rollback(self) -> None:
+        try:
+            if getattr(_DB, '_db', None) is not None:
+                _DB._db.rollback()
+        except Exception:
+            pass
+
+    def _write(self, cursor: sq.Cursor, classes: list[type]) -> None:
+        # Parents first for inserts/updates, children first for deletes
+        for cls in classes:
+            if (objs := self._saves.get(cls)):
+                cls._flush_saves(cursor, list(objs.values()), batch_size=self.batch_size)
+
+        for cls in reversed(classes):
+            for archive in (False, True):
+                ids = [id for id, a in self._deletes.get(cls, {}).items() if a == archive]
+                if ids:
+                    cls._flush_deletes(cursor, ids, archive=archive)
+
+    def _retry_delay(self, e: Exception, attempt: int) -> float:
+        """Delay before the next attempt, re-raises `e` when the failure is final."""
+        if attempt == self.MAX_RETRIES or not _is_transient_error(e):
+            raise e
+        self.logger.warning(f'Transient failure flushing {self}, retrying ({attempt}/{self.MAX_RETRIES})')
+        return self.RETRY_DELAY * attempt
+
+    def _committed(self, classes: list[type]) -> None:
+        if classes:
+            for cls in classes:
+                cls._E._db_updated = True
+            self.logger.info(f'{self} flushed.')
+
+        callbacks = self._callbacks.copy()
+        self.clear()
+        for callback in callbacks:
+            callback()
+
+    def flush(self) -> None:
+        """Writes every pending change in one transaction, retrying the whole unit on transient failures."""
+        classes = self._flush_order({*self._saves, *self._deletes})
+
+        if classes:
+            for attempt in range(1, self.MAX_RETRIES + 1):
+                try:
+                    for cls in classes:
+                        cls.connect()
+                    self._write(_DB._cursor, classes)
+                    _DB._db.commit()
+                    break
+
+                except Exception as e:
+                    self._rollback()
+                    delay = self._retry_delay(e, attempt)
+                    if isinstance(e, sq.InterfaceError):
+                        _DB.disconnect()
+                    sleep(delay)
+
+        self._committed(classes)
+
+    async def aflush(self) -> None:
+        """Async version of `flush`, the transaction runs on a pooled connection."""
+        classes = self._flush_order({*self._saves, *self._deletes})
+
+        if classes:
+            await _DBPool.prepare(*classes)
+            for attempt in range(1, self.MAX_RETRIES + 1):
+                try:
+                    await _DBPool.run(self._write, classes)
+                    break
+                except Exception as e:
+                    await asyncio.sleep(self._retry_delay(e, attempt))
+
+        self._committed(classes)
+
+    def _merge_into(self, other: 'UnitOfWork') -> None:
+        for cls, objs in self._saves.items():
+            other.save(objs.values())
+        for cls, ids in self._deletes.items():
+            for id, archive in ids.items():
+                other.delete_ids(cls, (id,), archive=archive)
+        other._callbacks.extend(self._callbacks)
+        self.clear()
+
+    def __enter__(self) -> 'UnitOfWork':
+        self._outer = UnitOfWork._active
+        UnitOfWork._active = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        UnitOfWork._active = self._outer
+        if exc_type is not None:
+            self.clear()
+        elif self._outer is not None:
+            self._merge_into(self._outer)
+        else:
+            self.flush()
+
+    def __str__(self) -> str:
+        return (f"{self.__class__.__name__}(saves={sum(map(len, self._saves.values()))}, "
+                f"deletes={sum(map(len, self._deletes.values()))})")
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
 class _Com(_DB):
 
     _E: TE
     _ES: TES
     _TABLE_NAME: str
+    _DEPENDS_ON: tuple[str, ...] = ()
+    ARRAY_CHUNK_SIZE = 10000
+    _SNAPSHOT_DICT_COLUMNS: tuple[str, ...] = ('status',)
+    _TOMBSTONES_SUFFIX = '_tombstones'
+    _IDS_SUFFIX = '_ids'
+    _PARTITION_KEY: str | None = None                # Column of the LIST partitioning, None for a plain table
+    _PARTITIONS: dict[str, tuple[str, ...]] = {}     # partition suffix -> values, other values go to <table>_default
+    _SWEPT_STATUSES: tuple[str, ...] = ()            # Statuses whose action is a deletion, run in bulk by `_ComES.sweep`
     _db_updated: bool
     DBContext: DBContext
     _sdata: dict[str, dict[str, ty.Any]]
@@ -134,60 +498,230 @@ class _Com(_DB):
 
     @classmethod
     def close(cls, backup: bool = True) -> None:
+        saved = [e for e in cls._E._cache if e.auto_save]
+        deleted = [e for e in cls._E._cache if e.auto_delete]
         try:
-            saver = cls._ES(e for e in cls._E._cache if e.auto_save)
-            try:
-                saver.save()
-            except Exception as e:
-                cls.logger.error(f'Exception ignored saving {saver}', skippable=True, base_error=e)
-                cls.logger.warning('Trying to save objects one by one (This can take considerable time for large data set)')
-                for e in saver._elements:
-                    e.save()
-            
-            for e in saver._elements:
-                e.auto_save = False
+            # Everything pending goes out in a single transaction
+            with UnitOfWork():
+                cls._ES(saved).save()
+                cls._ES(deleted).delete()
 
         except Exception as e:
-            cls.logger.error(f'Exception ignored saving {cls._E.__name__} objects', skippable=True, base_error=e)
+            cls.logger.error(f'Exception ignored flushing {cls._E.__name__} objects', skippable=True, base_error=e)
+            if not _is_transient_error(e):
+                cls.logger.warning('Trying to save and delete objects one by one (This can take considerable time for large data set)')
+                for obj, action in [*((o, 'save') for o in saved), *((o, 'delete') for o in deleted)]:
+                    try:
+                        getattr(obj, action)()
+                    except Exception as e:
+                        cls.logger.error(f'Exception ignored on {action} of {obj}', skippable=True, base_error=e)
         finally:
-            cls.auto_save = False
-
-        try:
-            deleter = cls._ES(e for e in cls._E._cache if e.auto_delete)
-            try:
-                deleter.delete()
-            except Exception as e:
-                cls.logger.error(f'Exception ignored deleting {deleter}', skippable=True, base_error=e)
-                cls.logger.warning('Trying to delete objects one by one (This can take considerable time for large data set)')
-                for e in deleter._elements:
-                    e.delete()
-            
-            for e in deleter._elements:
+            for e in saved:
+                e.auto_save = False
+            for e in deleted:
                 e.auto_delete = False
-
-        except Exception as e:
-            cls.logger.error(f'Exception ignored deleting {cls._E.__name__} objects', skippable=True, base_error=e)
-        finally:
+            cls.auto_save = False
             cls.auto_delete = False
 
     @classmethod
     def register(cls) -> None:
         register(cls.close)
 
+    @classmethod
+    def _tombstones_table(cls) -> str:
+        """Archived ids live there, the main table only holds live rows."""
+        return cls._TABLE_NAME + cls._TOMBSTONES_SUFFIX
+
+    @classmethod
+    def _ids_table(cls) -> str | None:
+        """Live ids of a partitioned table, its primary key keeps them unique across partitions. None for a plain table."""
+        return None if cls._PARTITION_KEY is None else cls._TABLE_NAME + cls._IDS_SUFFIX
+
+    @classmethod
+    def _create_partitioned_table(cls, table_name: str) -> None:
+        """Creates `table_name` partitioned by `_PARTITION_KEY`, with one partition per `_PARTITIONS` entry."""
+        items = utils.build_sql_items(cls._E)
+        # The primary key of a partitioned table must contain the partition key
+        items['id'] = 'TEXT NOT NULL'
+        _DB._cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS "{table_name}" (
+                {', '.join(f'{k} {v}' for k, v in items.items())},
+                PRIMARY KEY (id, {cls._PARTITION_KEY})
+            ) PARTITION BY LIST ({cls._PARTITION_KEY});
+        ''')
+        for suffix, values in cls._PARTITIONS.items():
+            _DB._cursor.execute(f'''CREATE TABLE IF NOT EXISTS "{table_name}_{suffix}" PARTITION OF "{table_name}" FOR VALUES IN ({cls._partition_values(suffix)});''')
+        _DB._cursor.execute(f'''CREATE TABLE IF NOT EXISTS "{table_name}_default" PARTITION OF "{table_name}" DEFAULT;''')
+
+    @classmethod
+    def _partition_values(cls, suffix: str) -> str:
+        return ', '.join("'" + str(v).replace("'", "''") + "'" for v in cls._PARTITIONS[suffix])
+
+    @classmethod
+    def _create_missing_partitions(cls) -> None:
+        """Adds the `_PARTITIONS` entries declared after the table was created, their rows are moved out of the default partition."""
+        for suffix in cls._PARTITIONS:
+            partition = f'{cls._TABLE_NAME}_{suffix}'
+            _DB._cursor.execute('SELECT to_regclass($1);', (partition,))
+            if _DB._cursor.fetchone()[0] is not None:
+                continue
+            # A partition cannot be created while the default one holds rows of its values
+            _DB._cursor.execute(f'''CREATE TABLE "{partition}" (LIKE "{cls._TABLE_NAME}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS);''')
+            _DB._cursor.execute(f'''
+                WITH moved AS (
+                    DELETE FROM "{cls._TABLE_NAME}_default" WHERE {cls._PARTITION_KEY} IN ({cls._partition_values(suffix)}) RETURNING *
+                )
+                INSERT INTO "{partition}" SELECT * FROM moved;
+            ''')
+            moved = _DB._cursor.rowcount
+            _DB._cursor.execute(f'''ALTER TABLE "{cls._TABLE_NAME}" ATTACH PARTITION "{partition}" FOR VALUES IN ({cls._partition_values(suffix)});''')
+            cls.logger.info(f'{partition} partition created, {moved} rows moved.')
+
+    @classmethod
+    def _rename_table(cls, table_name: str, new_name: str) -> None:
+        _DB._cursor.execute(f'''ALTER TABLE "{table_name}" RENAME TO "{new_name}";''')
+        if cls._PARTITION_KEY is not None:
+            for suffix in (*cls._PARTITIONS, 'default'):
+                _DB._cursor.execute(f'''ALTER TABLE "{table_name}_{suffix}" RENAME TO "{new_name}_{suffix}";''')
+
+    @classmethod
+    def _bulk_save_command(cls) -> str:
+        return (utils.build_sql_bulk_save_command(cls._E) if cls._PARTITION_KEY is None
+                else utils.build_sql_bulk_move_command(cls._E, cls._ids_table()))
+
     @classmethod
     def create_table(cls: ty.Type[T]) -> None:
         with cls.DBContext:
-            _DB._cursor.execute(utils.build_sql_table_command(cls._E))
+            relkind = None
+            if cls._PARTITION_KEY is None:
+                _DB._cursor.execute(utils.build_sql_table_command(cls._E))
+            else:
+                _DB._cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass($1);', (cls._TABLE_NAME,))
+                row = _DB._cursor.fetchone()
+                relkind = row[0] if row else None
+                if relkind is None:
+                    cls._create_partitioned_table(cls._TABLE_NAME)
+                elif relkind == 'p':
+                    cls._create_missing_partitions()
+
+            tombstones = cls._tombstones_table()
+            _DB._cursor.execute('SELECT to_regclass($1);', (tombstones,))
+            tombstones_exists = _DB._cursor.fetchone()[0] is not None
+            _DB._cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS "{tombstones}" (
+                    id TEXT PRIMARY KEY,
+                    archived_at TIMESTAMP NOT NULL DEFAULT now()
+                );
+            ''')
+            if not tombstones_exists:
+                # Archived rows used to stay in the main table with every column set to NULL
+                _DB._cursor.execute(f'''
+                    WITH archived AS (DELETE FROM "{cls._TABLE_NAME}" WHERE status IS NULL RETURNING id)
+                    INSERT INTO "{tombstones}" (id) SELECT id FROM archived ON CONFLICT DO NOTHING;
+                ''')
+                cls.logger.info(f'{tombstones} table created, {_DB._cursor.rowcount} archived rows moved.')
+
+            if relkind is not None and relkind != 'p':
+                # Plain table of an older version, its rows are copied in the partitioned one.
+                # Indexes and triggers go with the old table and are recreated on the new one by the usual setup.
+                old_table_name = cls._TABLE_NAME + '_unpartitioned'
+                keys = utils.build_sql_keys(cls._E)
+                _DB._cursor.execute(f'''ALTER TABLE "{cls._TABLE_NAME}" RENAME TO "{old_table_name}";''')
+                cls._create_partitioned_table(cls._TABLE_NAME)
+                _DB._cursor.execute(f'''INSERT INTO "{cls._TABLE_NAME}" ({keys}) SELECT {keys} FROM "{old_table_name}";''')
+                _DB._cursor.execute(f'''DROP TABLE "{old_table_name}";''')
+                cls.logger.info(f'{cls._TABLE_NAME} table partitioned by {cls._PARTITION_KEY}.')
+
+            if (ids_table := cls._ids_table()) is not None:
+                _DB._cursor.execute('SELECT to_regclass($1);', (ids_table,))
+                if _DB._cursor.fetchone()[0] is None:
+                    _DB._cursor.execute(f'''CREATE TABLE "{ids_table}" (id TEXT PRIMARY KEY);''')
+                    _DB._cursor.execute(f'''INSERT INTO "{ids_table}" (id) SELECT id FROM "{cls._TABLE_NAME}" ON CONFLICT DO NOTHING;''')
+                    cls.logger.info(f'{ids_table} table created, {_DB._cursor.rowcount} ids registered.')
             _DB._db.commit()
 
     @classmethod
     def create_indexs(cls) -> None:
         pass
+
+    @classmethod
+    def _flush_saves(cls, cursor: sq.Cursor, objs: list[TE], batch_size: int | None = None) -> None:
+        """Upserts objects inside the caller's transaction, one statement per batch."""
+        query = cls._bulk_save_command()
+        batch_size = batch_size or len(objs)
+        for i in range(0, len(objs), batch_size):
+            cursor.execute(query, (utils.build_sql_bulk_args(objs[i:i + batch_size]),))
+        # Saving an archived id brings it back to life
+        for chunk in utils.chunks([o.id for o in objs], cls.ARRAY_CHUNK_SIZE):
+            cursor.execute(f'''DELETE FROM "{cls._tombstones_table()}" WHERE id = ANY($1);''', (chunk,))
+
+    @classmethod
+    def _flush_deletes(cls, cursor: sq.Cursor, ids: list[str], archive: bool = False) -> None:
+        """Deletes (or archives) rows inside the caller's transaction."""
+        cls._delete_dependents(cursor, ids)
+        # Same statement text whatever the number of ids, chunked to bound the array size
+        for chunk in utils.chunks(ids, cls.ARRAY_CHUNK_SIZE):
+            if archive:
+                cursor.execute(f'''
+                    INSERT INTO "{cls._tombstones_table()}" (id) SELECT unnest($1::text[])
+                    ON CONFLICT (id) DO UPDATE SET archived_at = excluded.archived_at;
+                ''', (chunk,))
+            cursor.execute(f'''DELETE FROM "{cls._TABLE_NAME}" WHERE id = ANY($1);''', (chunk,))
+            cls._release_ids(cursor, chunk)
+
+    @classmethod
+    def _release_ids(cls, cursor: sq.Cursor, ids: list[str] | None = None) -> None:
+        """Frees deleted ids in the ids table of a partitioned table, all of them when `ids` is None."""
+        if (ids_table := cls._ids_table()) is None:
+            return
+        if ids is None:
+            cursor.execute(f'''DELETE FROM "{ids_table}";''')
+        else:
+            cursor.execute(f'''DELETE FROM "{ids_table}" WHERE id = ANY($1);''', (ids,))
+
+    @classmethod
+    def _delete_dependents(cls, cursor: sq.Cursor, ids: list[str] | None = None) -> None:
+        """Deletes rows of tables derived from this one, all of them when `ids` is None."""
+        pass
+
+    @classmethod
+    def _refresh_dependents(cls, cursor: sq.Cursor, ids: list[str]) -> None:
+        """Re-derives rows of tables derived from this one after a set-based update of `ids`."""
+        pass
+
+    @classmethod
+    def _fetch_cached(cls, cursor: sq.Cursor, query: str, params: ty.Sequence = ()) -> tuple[list[str], list]:
+        """Runs a read query through the QueryCache, returns (columns, rows)."""
+        result = QueryCache.get(cls._E, query, params)
+        if result is None:
+            cursor.execute(query, params)
+            result = ([description[0] for description in cursor.description], cursor.fetchall())
+            QueryCache.put(cls._E, query, params, result)
+        return result
+
+    @classmethod
+    def _transition_status_sql(cls, status: Enum, params: list) -> str:
+        """SQL expression of the status a row takes when moved to `status`, parameters are appended to `params`."""
+        params.append(status.value)
+        return f'${len(params)}'
+
+    @classmethod
+    def _import_rows(cls, cursor: sq.Cursor, rows: list[dict]) -> None:
+        """Upserts raw rows (lower case column names) inside the caller's transaction."""
+        # Rows without status are archived ids (snapshots carry them as such)
+        archived = [r['id'] for r in rows if r.get('status') is None]
+        live = [r for r in rows if r.get('status') is not None]
+        if live:
+            cursor.execute(cls._bulk_save_command(), (json.dumps(live, separators=(',', ':')),))
+            cursor.execute(f'''DELETE FROM "{cls._tombstones_table()}" WHERE id = ANY($1);''', ([r['id'] for r in live],))
+        if archived:
+            cursor.execute(f'''DELETE FROM "{cls._TABLE_NAME}" WHERE id = ANY($1);''', (archived,))
+            cls._release_ids(cursor, archived)
+            cursor.execute(f'''INSERT INTO "{cls._tombstones_table()}" (id) SELECT unnest($1::text[]) ON CONFLICT DO NOTHING;''', (archived,))
     
     @classmethod
-    def _build_query(cls, *args, limit: int | None = None, **kwargs) -> tuple[str, list]:
-        """Builds the SQL query and parameters for loading objects."""
-        query = f"""SELECT * FROM "{cls._TABLE_NAME}" WHERE (status IS NOT NULL)"""
+    def _build_filters(cls, *args, **kwargs) -> tuple[list[str], list]:
+        """Builds the WHERE conditions and their parameters ($1, $2...) from load arguments."""
         query_filters = []
         query_params = []
 
@@ -197,8 +731,8 @@ class _Com(_DB):
                     query_filters.append(f"{key} IS NOT NULL")
                 elif op.lower() == 'not in':
                     if value:
-                        query_filters.append(f"{key} {op} ({','.join(f'${i}' for i in range(len(query_params) + 1, len(value) + len(query_params) + 1))})")
-                        query_params.extend(value)
+                        query_filters.append(f"{key} <> ALL(${len(query_params) + 1})")
+                        query_params.append(utils.build_sql_array(value))
                 else:
                     query_filters.append(f"{key} {op} ${len(query_params) + 1}")
                     query_params.append(value)
@@ -207,8 +741,8 @@ class _Com(_DB):
                     query_filters.append(f"{key} IS NULL")
                 elif op.lower() == 'in':
                     if value:
-                        query_filters.append(f"{key} {op} ({','.join(f'${i}' for i in range(len(query_params) + 1, len(value) + len(query_params) + 1))})")
-                        query_params.extend(value)
+                        query_filters.append(f"{key} = ANY(${len(query_params) + 1})")
+                        query_params.append(utils.build_sql_array(value))
                 else:
                     query_filters.append(f"{key} {op} ${len(query_params) + 1}")
                     query_params.append(value)
@@ -225,8 +759,16 @@ class _Com(_DB):
             op = '='
             add_filter(key, op, value)
 
+        return query_filters, query_params
+
+    @classmethod
+    def _build_query(cls, *args, limit: int | None = None, **kwargs) -> tuple[str, list]:
+        """Builds the SQL query and parameters for loading objects."""
+        query = f'''SELECT * FROM "{cls._TABLE_NAME}"'''
+        query_filters, query_params = cls._build_filters(*args, **kwargs)
+
         if query_filters:
-            query += " AND " + " AND ".join(query_filters)
+            query += " WHERE " + " AND ".join(query_filters)
 
         if limit is not None:
             query += f" LIMIT {int(limit)}"
@@ -245,13 +787,49 @@ class _ComE(_Com):
         if (id is None) and args:
             id = args[0]
 
-        if id is not None:
-            for ce in cls._E._cache:
-                if ce.id == id:
-                    return ce
+        if id is not None and (ce := cls._E._cache.get(id)) is not None:
+            return ce
 
         return super().__new__(cls)
 
+    @classmethod
+    def _from_row(cls: ty.Type[TE], columns: list[str], row: ty.Sequence,
+            auto_save: bool = False, auto_delete: bool = False
+        ) -> TE:
+        """Entity over a raw row, `__init__` only runs on the first access to an attribute other than the id."""
+        id = row[columns.index('id')]
+        obj = cls._E._cache.get(id)
+        if obj is not None and '_lazy_row' not in obj.__dict__:
+            # Already materialized, refreshed with the row as a regular load does
+            obj.__init__(**utils.parse_sql_args(cls._E, dict(zip(columns, row))), auto_save=auto_save, auto_delete=auto_delete)
+            return obj
+
+        if obj is None:
+            obj = object.__new__(cls._E)
+            obj.id = id
+            cls._E._cache.add(obj)
+        obj._lazy_row = (columns, row)
+        obj.auto_save = auto_save
+        obj.auto_delete = auto_delete
+        return obj
+
+    def __getattr__(self, name: str) -> ty.Any:
+        # Only reached for attributes not set yet, which on a lazy entity means it is time to build it
+        lazy_row = self.__dict__.pop('_lazy_row', None) if not name.startswith('__') else None
+        if lazy_row is None:
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+        columns, row = lazy_row
+        # The row is only consumed once built, a failing __init__ leaves the entity lazy and raises again on next access
+        state = dict(self.__dict__)
+        try:
+            self.__init__(**utils.parse_sql_args(self._E, dict(zip(columns, row))),
+                          auto_save=self.auto_save, auto_delete=self.auto_delete)
+        except Exception:
+            self.__dict__.clear()
+            self.__dict__.update(state, _lazy_row=lazy_row)
+            raise
+        return getattr(self, name)
+
     def __init__(self,
             id: str | None = None,
             creation_date: str | None = None,
@@ -260,6 +838,8 @@ class _ComE(_Com):
             auto_save: bool = False,
             auto_delete: bool = False
         ) -> None:
+        # A lazy entity built explicitly no longer waits for its row
+        self.__dict__.pop('_lazy_row', None)
         self.creation_date = creation_date or utils.create_unique_date()
         self.id = id or self.creation_date
         self.metadata = metadata or ''
@@ -298,6 +878,10 @@ class _ComE(_Com):
         if ((f := getattr(self, self.status.name.lower(), None)) is not None) and callable(f):
             f()
 
+    def _sweep_candidate(self) -> bool:
+        """Whether the status action of this entity deletes it, see `_ComES.sweep`."""
+        return False
+
     def __bool__(self) -> bool:
         return True
 
@@ -341,16 +925,13 @@ class _ComE(_Com):
         """Load a single object by arguments."""
         with cls.DBContext:
             query, query_params = cls._build_query(*args, **kwargs)
-            _DB._cursor.execute(query, query_params)
-            row = _DB._cursor.fetchone()
-
-            if not row:
-                cls.logger.warning(f"Object not found with query: {query} params: {query_params}")
-                return None
+            columns, rows = cls._fetch_cached(_DB._cursor, query, query_params)
 
-            columns = [description[0] for description in _DB._cursor.description]
+        if not rows:
+            cls.logger.warning(f"Object not found with query: {query} params: {query_params}")
+            return None
 
-        return utils.parse_sql_args(cls, dict(zip(columns, row)))
+        return utils.parse_sql_args(cls, dict(zip(columns, rows[0])))
 
     @classmethod
     def load(cls: ty.Type[TE], *args,
@@ -366,11 +947,9 @@ class _ComE(_Com):
     
     def save(self) -> None:
         """Saves or updates the current video in the PostGreSQL database."""
-        with self.DBContext:
-            self._cursor.execute(utils.build_sql_save_command(self._E), utils.build_sql_args(self))
-            self._db.commit()
-        self._E._db_updated = True
-        self.logger.info(f"{self} saved.")
+        with UnitOfWork() as uow:
+            uow.save((self,))
+            uow.on_commit(lambda: self.logger.info(f"{self} saved."))
 
     def delete(self,
             archive: bool = False,
@@ -381,22 +960,20 @@ class _ComE(_Com):
         if self not in self._E._cache:
             self.logger.warning(f'{self} already deleted, this instance is detached from any database saving process.')
             return
-            
-        with self.DBContext:
-            query = (f'''UPDATE "{self._TABLE_NAME}" SET {', '.join((f"{col} = NULL" for col in self._sdata.keys()))} WHERE id = $1''' 
-                     if archive
-                     else f'''DELETE FROM "{self._TABLE_NAME}" WHERE id = $1''')
-            self._cursor.execute(query, (self.id,))
-            self._db.commit()
-            
+
+        with UnitOfWork() as uow:
+            uow.delete((self,), archive=archive)
+            uow.on_commit(lambda: self._detach(remove_file=remove_file, send_to_trash=send_to_trash, not_exists_ok=not_exists_ok))
+
+    def _detach(self, remove_file: bool = True, send_to_trash: bool = False, not_exists_ok: bool = True) -> None:
+        """Local side of a committed delete."""
         if remove_file:
             self.path.remove(send_to_trash=send_to_trash, not_exists_ok=not_exists_ok)
 
             self.auto_save = False
             self.auto_delete = False
 
-        self._E._db_updated = True
-        self._E._cache.remove(self)
+        self._E._cache.discard(self)
         self.logger.info(f"{self} deleted.")
 
 
@@ -465,9 +1042,81 @@ class _ComES(_Com, UList[TE]):
         for e in self._elements:
             e.status = value
     
-    def status_action(self) -> None:
+    def status_action(self, dry_run: bool = False, progress: ty.Callable[[str, int, int], None] | None = None) -> None:
+        # Deleting actions run in bulk, the others one element at a time
+        self.sweep(dry_run=dry_run, progress=progress)
+        if dry_run:
+            return
         for e in self._elements:
-            e.status_action()
+            if e.status.name not in self._E._SWEPT_STATUSES:
+                e.status_action()
+
+    def sweep(self: TES,
+            dry_run: bool = False,
+            max_concurrent: int = 8,
+            progress: ty.Callable[[str, int, int], None] | None = None
+        ) -> TES:
+        """Deletes at once the rows and files of the `_sweep_candidate` elements and returns them, `progress(stage, done, total)`."""
+        report = progress or (lambda stage, done, total: None)
+        candidates = self._sweep_candidates(dry_run, report)
+        if (not dry_run) and candidates:
+            with UnitOfWork() as uow:
+                uow.delete(candidates)
+                uow.on_commit(lambda: report('db', len(candidates), len(candidates)))
+                uow.on_commit(lambda: self._sweep_files(candidates, max_concurrent, report))
+                uow.on_commit(lambda: self._swept(candidates))
+        return self._E._ES(candidates)
+
+    async def asweep(self: TES,
+            dry_run: bool = False,
+            max_concurrent: int = 8,
+            progress: ty.Callable[[str, int, int], None] | None = None
+        ) -> TES:
+        """Async version of `sweep`, the files are removed off the event loop once the unit is committed."""
+        report = progress or (lambda stage, done, total: None)
+        candidates = self._sweep_candidates(dry_run, report)
+        if (not dry_run) and candidates:
+            uow = UnitOfWork()
+            uow.delete(candidates)
+            uow.on_commit(lambda: report('db', len(candidates), len(candidates)))
+            await uow.aflush()
+            await asyncio.to_thread(self._sweep_files, candidates, max_concurrent, report)
+            self._swept(candidates)
+        return self._E._ES(candidates)
+
+    def _sweep_candidates(self, dry_run: bool, report: ty.Callable[[str, int, int], None]) -> list[TE]:
+        total = len(self._elements)
+        candidates: list[TE] = []
+        for i, e in enumerate(self._elements, 1):
+            if e._sweep_candidate():
+                candidates.append(e)
+            report('classify', i, total)
+        self.logger.info(f'{len(candidates)}/{total} {self._E.__name__} objects to sweep{" (dry run)" if dry_run else ""}')
+        return candidates
+
+    def _sweep_remote(self) -> None:
+        """Deletes the remote copies of the swept elements."""
+        pass
+
+    def _sweep_files(self, elements: list[TE], max_concurrent: int, report: ty.Callable[[str, int, int], None]) -> None:
+        """Remote and local files of a committed sweep, runs in any thread (no event loop needed)."""
+        self._E._ES(elements)._sweep_remote()
+        report('remote', len(elements), len(elements))
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrent)) as pool:
+            for _ in pool.map(lambda e: e.path.remove(send_to_trash=True, not_exists_ok=True), elements):
+                done += 1
+                report('local', done, len(elements))
+
+    def _swept(self, elements: list[TE]) -> None:
+        """Forgets the elements of a committed sweep."""
+        self._E._ES(elements)._detach(elements, remove_file=False)
+
+        removed = set(elements)
+        kept = [e for e in self._elements if e not in removed]
+        self.clear()
+        self.extend(kept)
 
     def info(self) -> str:
         return "\n".join(v.info() for v in self._elements) + f"\nTotal: {len(self._elements)}"
@@ -495,15 +1144,50 @@ class _ComES(_Com, UList[TE]):
     @classmethod
     def clear_data(cls: ty.Type[TES]) -> None:
         """Clear all the data in the data file."""
-        cls.clear_load_cache()
+        cls._E._cache.clear()
         
         with cls.DBContext:
+            cls._delete_dependents(_DB._cursor)
             _DB._cursor.execute(f'''DELETE FROM "{cls._TABLE_NAME}";''')
+            cls._release_ids(_DB._cursor)
+            _DB._cursor.execute(f'''DELETE FROM "{cls._tombstones_table()}";''')
             _DB._db.commit()
 
         cls._E._db_updated = True
         cls.logger.warning("Data cleared, you can recover it using 'recover_data' method.")
 
+    @classmethod
+    def drop_partition(cls: ty.Type[TES], suffix: str, archive: bool = False, max_concurrent: int = 8) -> int:
+        """Deletes the rows, dependents and files of a whole partition (`_PARTITIONS` key or 'default'), returns the row count."""
+        if cls._PARTITION_KEY is None or (suffix != 'default' and suffix not in cls._PARTITIONS):
+            raise ValueError(f'{cls._TABLE_NAME} has no partition "{suffix}"')
+        partition = f'{cls._TABLE_NAME}_{suffix}'
+
+        with cls.DBContext:
+            # Rows cannot move to the partition while it is dropped
+            _DB._cursor.execute(f'''LOCK TABLE "{partition}" IN ACCESS EXCLUSIVE MODE;''')
+            _DB._cursor.execute(f'''SELECT * FROM "{partition}";''')
+            columns = [description[0] for description in _DB._cursor.description]
+            # Lazy entities, only their paths are built to remove the files
+            dropped = cls([cls._E._from_row(columns, row) for row in _DB._cursor.fetchall()])
+            ids = [e.id for e in dropped]
+            for chunk in utils.chunks(ids, cls.ARRAY_CHUNK_SIZE):
+                cls._delete_dependents(_DB._cursor, chunk)
+                if archive:
+                    _DB._cursor.execute(f'''
+                        INSERT INTO "{cls._tombstones_table()}" (id) SELECT unnest($1::text[])
+                        ON CONFLICT (id) DO UPDATE SET archived_at = excluded.archived_at;
+                    ''', (chunk,))
+                cls._release_ids(_DB._cursor, chunk)
+            _DB._cursor.execute(f'''TRUNCATE "{partition}";''')
+            _DB._db.commit()
+
+        cls._E._db_updated = True
+        dropped._sweep_files(dropped._elements, max_concurrent, lambda stage, done, total: None)
+        dropped._swept(dropped._elements)
+        cls.logger.info(f'{partition} partition dropped, {len(ids)} rows.')
+        return len(ids)
+
     @classmethod
     def refresh_data(cls: ty.Type[TES]) -> None:
         cls._E._cache.clear()
@@ -511,7 +1195,10 @@ class _ComES(_Com, UList[TE]):
         with cls.DBContext:
             temp_table_name = cls._TABLE_NAME + '_TEMP'
 
-            _DB._cursor.execute(utils.build_sql_table_command(cls._E).replace(cls._TABLE_NAME, temp_table_name))
+            if cls._PARTITION_KEY is None:
+                _DB._cursor.execute(utils.build_sql_table_command(cls._E).replace(cls._TABLE_NAME, temp_table_name))
+            else:
+                cls._create_partitioned_table(temp_table_name)
 
             _DB._cursor.execute(f'''
                 SELECT column_name FROM information_schema.columns
@@ -532,58 +1219,102 @@ class _ComES(_Com, UList[TE]):
             ''')
 
             _DB._cursor.execute(f'''DROP TABLE "{cls._TABLE_NAME}";''')
-            _DB._cursor.execute(f'''ALTER TABLE "{temp_table_name}" RENAME TO "{cls._TABLE_NAME}";''')
+            cls._rename_table(temp_table_name, cls._TABLE_NAME)
 
             _DB._db.commit()
 
+        # The table was recreated without its indexes and triggers, set it up again
+        _DB._initialized.discard(cls._TABLE_NAME)
+        cls.connect()
+
         cls._E._db_updated = True
         cls.logger.warning(f'{cls._TABLE_NAME} table refreshed.')
         
+    @classmethod
+    def _fetch_rows(cls: ty.Type[TES], cursor: sq.Cursor, *args, limit: int | None = None, **kwargs) -> tuple[list[str], list]:
+        """Runs a load query on `cursor`, returns (columns, raw rows), shared by the sync and async loaders."""
+        query, query_params = cls._build_query(*args, limit=limit, **kwargs)
+        return cls._fetch_cached(cursor, query, query_params)
+
     @classmethod
     def _load_iter_args(cls: ty.Type[TES], *args, limit: int | None = None, **kwargs) -> ty.Iterator[dict]:
         """Load multiple objects by arguments."""
         with cls.DBContext:
-            query, query_params = cls._build_query(*args, limit=limit, **kwargs)
-            #print(query, query_params)
-            _DB._cursor.execute(query, query_params)
-            columns = [description[0] for description in _DB._cursor.description]
-            gen = (utils.parse_sql_args(cls._E, dict(zip(columns, row))) for row in _DB._cursor.fetchall())
-        return gen
+            columns, rows = cls._fetch_rows(_DB._cursor, *args, limit=limit, **kwargs)
+        return (utils.parse_sql_args(cls._E, dict(zip(columns, row))) for row in rows)
 
     @classmethod
     def load_iter(cls: ty.Type[TES],
-            *args, auto_save: bool = False, auto_delete: bool = False, limit: int | None = None, **kwargs
+            *args, auto_save: bool = False, auto_delete: bool = False, limit: int | None = None, lazy: bool = False, **kwargs
         ) -> ty.Iterator[TE]:
-        """Load objects from the database and filter them based on attributes or aqution."""
-        return (cls._E(**sql_args, auto_save=auto_save, auto_delete=auto_delete) for sql_args in cls._load_iter_args(*args, **kwargs, limit=limit))
+        """Load objects from the database and filter them based on attributes or aqution, `lazy` ones are built on first use."""
+        if not lazy:
+            return (cls._E(**sql_args, auto_save=auto_save, auto_delete=auto_delete) for sql_args in cls._load_iter_args(*args, **kwargs, limit=limit))
+        with cls.DBContext:
+            columns, rows = cls._fetch_rows(_DB._cursor, *args, limit=limit, **kwargs)
+        return (cls._E._from_row(columns, row, auto_save=auto_save, auto_delete=auto_delete) for row in rows)
     
     @classmethod
     def load(cls: ty.Type[TES],
             *args, filter_key: ty.Callable[[TE], bool] | None = None,
-            auto_save: bool = False, auto_delete: bool = False, limit: int | None = None, **kwargs
+            auto_save: bool = False, auto_delete: bool = False, limit: int | None = None, lazy: bool = False, **kwargs
         ) -> TES:
         """Cached implementation of load method for collections"""
-        gen = cls.load_iter(*args, **kwargs, auto_save=False, auto_delete=False, limit=limit)
+        gen = cls.load_iter(*args, **kwargs, auto_save=False, auto_delete=False, limit=limit, lazy=lazy)
+        objs = cls(gen if filter_key is None else filter(filter_key, gen), auto_save=auto_save, auto_delete=auto_delete)
+        cls.logger.info(f'{len(objs)} {cls._E.__name__} objects loaded')
+        return objs
+
+    @classmethod
+    def load_columns(cls: ty.Type[TES], *args, limit: int | None = None, **kwargs) -> ColumnStore:
+        """Loads matching rows into a ColumnStore, without building any object."""
+        with cls.DBContext:
+            columns, rows = cls._fetch_rows(_DB._cursor, *args, limit=limit, **kwargs)
+        cls.logger.info(f'{len(rows)} {cls._E.__name__} rows loaded as columns')
+        return ColumnStore(cls._E, columns, rows)
+
+    def to_columns(self) -> ColumnStore:
+        return ColumnStore.from_objects(self._E, self._elements)
+
+    @classmethod
+    async def aload(cls: ty.Type[TES],
+            *args, filter_key: ty.Callable[[TE], bool] | None = None,
+            auto_save: bool = False, auto_delete: bool = False, limit: int | None = None, **kwargs
+        ) -> TES:
+        """Async version of `load`, the query runs on a pooled connection without blocking the event loop."""
+        await _DBPool.prepare(cls._E)
+        columns, rows = await _DBPool.run(lambda cursor: cls._fetch_rows(cursor, *args, limit=limit, **kwargs))
+        # Objects are built in the event loop thread, the entity cache is not thread safe
+        gen = (cls._E._from_row(columns, row, auto_save=False, auto_delete=False) for row in rows)
         objs = cls(gen if filter_key is None else filter(filter_key, gen), auto_save=auto_save, auto_delete=auto_delete)
         cls.logger.info(f'{len(objs)} {cls._E.__name__} objects loaded')
         return objs
 
     def save(self,
-            batch_size: int = 1000
+            batch_size: int | None = None
         ) -> None:
         """Saves a list of objects"""
         if self._elements:
-            with self.DBContext:
-                query = utils.build_sql_save_command(self._E)
-                [[self._cursor.executemany(
-                    query, map(utils.build_sql_args, self._elements[i:i + batch_size])
-                )] for i in range(0, len(self._elements), batch_size)]
-                self._db.commit()
-            
-            self._E._db_updated = True
-            self.logger.info(f'{len(self._elements)} {self._E.__name__} objects saved')
-            # Clear caches to ensure fresh data is loaded next time
-            self._E._cache = self._E._cache.difference(self._elements)
+            elements = self._elements.copy()
+            with UnitOfWork(batch_size=batch_size) as uow:
+                uow.save(elements)
+                uow.on_commit(lambda: self._saved(elements))
+
+    async def asave(self,
+            batch_size: int | None = None
+        ) -> None:
+        """Async version of `save`."""
+        if self._elements:
+            elements = self._elements.copy()
+            uow = UnitOfWork(batch_size=batch_size)
+            uow.save(elements)
+            uow.on_commit(lambda: self._saved(elements))
+            await uow.aflush()
+
+    def _saved(self, elements: list[TE]) -> None:
+        self.logger.info(f'{len(elements)} {self._E.__name__} objects saved')
+        # Clear caches to ensure fresh data is loaded next time
+        self._E._cache.difference_update(elements)
 
     def delete(self,
             archive: bool = False,
@@ -592,27 +1323,141 @@ class _ComES(_Com, UList[TE]):
             not_exists_ok: bool = True
         ) -> None:
         if self._elements:
-            with self.DBContext:
-                query = (f'''UPDATE "{self._TABLE_NAME}" SET {', '.join((f"{col} = NULL" for col in self._sdata.keys()))} WHERE id IN ({', '.join(f'${i+1}' for i in range(len(self._elements)))})'''
-                         if archive
-                         else f'''DELETE FROM "{self._TABLE_NAME}" WHERE id IN ({', '.join(f'${i+1}' for i in range(len(self._elements)))})''')
-                self._cursor.execute(query, [e.id for e in self._elements])
-                self._db.commit()
-                
-            if remove_file:
-                [v.path.remove(send_to_trash=send_to_trash, not_exists_ok=not_exists_ok) for v in self._elements]
-
-            self._elements.clear()
+            elements = self._elements.copy()
+            with UnitOfWork() as uow:
+                uow.delete(elements, archive=archive)
+                uow.on_commit(lambda: self._detach(elements, remove_file=remove_file,
+                                                   send_to_trash=send_to_trash, not_exists_ok=not_exists_ok))
 
-            for e in self._elements:
-                e.auto_save = False
-                e.auto_delete = False
-            
-            self._E._db_updated = True
-            self.logger.info(f'{len(self._elements)} {self._E.__name__} objects deleted')
-            # Clear caches to ensure fresh data is loaded next time
-            self._E._cache = self._E._cache.difference(self._elements)
-            self._elements.clear()
+    async def adelete(self,
+            archive: bool = False,
+            remove_file: bool = True,
+            send_to_trash: bool = False,
+            not_exists_ok: bool = True
+        ) -> None:
+        """Async version of `delete`."""
+        if self._elements:
+            elements = self._elements.copy()
+            uow = UnitOfWork()
+            uow.delete(elements, archive=archive)
+            uow.on_commit(lambda: self._detach(elements, remove_file=remove_file,
+                                               send_to_trash=send_to_trash, not_exists_ok=not_exists_ok))
+            await uow.aflush()
+
+    def _detach(self,
+            elements: list[TE],
+            remove_file: bool = True,
+            send_to_trash: bool = False,
+            not_exists_ok: bool = True
+        ) -> None:
+        """Local side of a committed delete."""
+        if remove_file:
+            [v.path.remove(send_to_trash=send_to_trash, not_exists_ok=not_exists_ok) for v in elements]
+
+        for e in elements:
+            e.auto_save = False
+            e.auto_delete = False
+
+        self.logger.info(f'{len(elements)} {self._E.__name__} objects deleted')
+        # Clear caches to ensure fresh data is loaded next time
+        self._E._cache.difference_update(elements)
+        self.clear()
+
+    @classmethod
+    def export_snapshot(cls, path: PathLike) -> int:
+        """Writes the whole table to a columnar snapshot file (archived ids as rows without data), returns its size."""
+        keys = ['id', *cls._E._sdata]
+        columns = {k: [] for k in keys}
+        with cls.DBContext:
+            # Pages are read from a single consistent view of the table
+            _DB._db.commit()
+            _DB._cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;')
+            last_id = None
+            while True:
+                _DB._cursor.execute(f'''
+                    SELECT {utils.build_sql_keys(cls._E)} FROM "{cls._TABLE_NAME}"
+                    {'' if last_id is None else 'WHERE id > $1'} ORDER BY id LIMIT {int(cls.ARRAY_CHUNK_SIZE)};
+                ''', () if last_id is None else (last_id,))
+                rows = _DB._cursor.fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    for k, v in zip(keys, row):
+                        columns[k].append(v)
+                last_id = rows[-1][0]
+
+            _DB._cursor.execute(f'''SELECT id FROM "{cls._tombstones_table()}" ORDER BY id;''')
+            for (id,) in _DB._cursor.fetchall():
+                columns['id'].append(id)
+                for k in keys[1:]:
+                    columns[k].append(None)
+            _DB._db.commit()
+
+        size = Snapshot.write(path, cls._TABLE_NAME, columns, dict_columns=cls._SNAPSHOT_DICT_COLUMNS)
+        cls.logger.info(f'{len(columns["id"])} {cls._E.__name__} rows exported to snapshot.')
+        return size
+
+    @classmethod
+    def import_snapshot(cls, path: PathLike, batch_size: int | None = None) -> int:
+        """Upserts every row of a snapshot file in one transaction, returns the number of rows."""
+        keys = ['id', *cls._E._sdata]
+        with Snapshot(path) as snap:
+            if snap.table != cls._TABLE_NAME:
+                raise ValueError(f'Snapshot of table "{snap.table}" cannot be imported in "{cls._TABLE_NAME}"')
+            # Columns added since the export are left to their default
+            columns = [snap.column(k) if k in snap.names else [None] * snap.rows for k in keys]
+
+        # Unquoted column names are folded to lower case by PostgreSQL
+        names = [k.lower() for k in keys]
+        rows = [dict(zip(names, values)) for values in zip(*columns)]
+        with cls.DBContext:
+            for chunk in utils.chunks(rows, batch_size or cls.ARRAY_CHUNK_SIZE):
+                cls._import_rows(_DB._cursor, chunk)
+            _DB._db.commit()
+
+        cls._E._cache.clear()
+        cls._E._db_updated = True
+        cls.logger.info(f'{len(rows)} {cls._E.__name__} rows imported from snapshot.')
+        return len(rows)
+
+    @classmethod
+    def transition(cls: ty.Type[TES], to: str | Enum, *args, **kwargs) -> dict[str, Enum]:
+        """Moves the rows matching the load arguments to the status `to` in one UPDATE, returns the new status of each id."""
+        to = getattr(cls.statuses, to) if isinstance(to, str) else to
+        assert to in cls.statuses, f'Invalid status: {to}'
+        for arg in args:
+            # An empty IN filter is dropped by the query builder, it must not turn into a whole table update
+            if isinstance(arg, (list, tuple)) and len(arg) == 3 and str(arg[1]).lower() == 'in' and not arg[2]:
+                return {}
+
+        query_filters, query_params = cls._build_filters(*args, **kwargs)
+        status_sql = cls._transition_status_sql(to, query_params)
+        with cls.DBContext:
+            _DB._cursor.execute(f'''
+                UPDATE "{cls._TABLE_NAME}" v SET status = {status_sql}
+                {('WHERE ' + ' AND '.join(query_filters)) if query_filters else ''}
+                RETURNING v.id, v.status;
+            ''', query_params)
+            updated = {id: cls.statuses(status) for id, status in _DB._cursor.fetchall()}
+            if updated:
+                cls._refresh_dependents(_DB._cursor, list(updated))
+            _DB._db.commit()
+
+        # Loaded objects follow the database without being rebuilt
+        for id, status in updated.items():
+            if (obj := cls._E._cache.get(id)) is None:
+                continue
+            if (lazy_row := obj.__dict__.get('_lazy_row')) is None:
+                obj._status = status
+            else:
+                # Not built yet, it must not be built later from the old status
+                columns, row = lazy_row
+                row = list(row)
+                row[columns.index('status')] = status.value
+                obj._lazy_row = (columns, tuple(row))
+        cls._E._db_updated = True
+        cls.logger.info(f'{len(updated)} {cls._E.__name__} objects moved to {to.name}.')
+        return updated
 
     @classmethod
     def load_column(cls, column_name: str) -> list[str]:
@@ -629,23 +1474,43 @@ class _ComES(_Com, UList[TE]):
     @classmethod
     def delete_row(cls, row_id: str) -> None:
         """Fetches all video column items from the database."""
-        with cls.DBContext:
-            cls._cursor.execute(f'''DELETE FROM "{cls._TABLE_NAME}" WHERE id = $1''', (row_id,))
-            cls._db.commit()
+        with UnitOfWork() as uow:
+            uow.delete_ids(cls, (row_id,))
+            uow.on_commit(lambda: cls._row_deleted(row_id))
 
+    @classmethod
+    def _row_deleted(cls, row_id: str) -> None:
         cls.logger.info(f'Deleted row with id: {row_id}.')
         # Clear caches to ensure fresh data is loaded next time
         cls._E._cache.clear()
 
+    @classmethod
+    def banned_ids(cls, ids: list[str] | None = None) -> set[str]:
+        """Archived ids among `ids`, all of them when `ids` is None (primary key lookups on the tombstones table)."""
+        with cls.DBContext:
+            if ids is None:
+                _DB._cursor.execute(f'''SELECT id FROM "{cls._tombstones_table()}";''')
+                return {row[0] for row in _DB._cursor.fetchall()}
+            banned = set()
+            for chunk in utils.chunks(ids, cls.ARRAY_CHUNK_SIZE):
+                _DB._cursor.execute(f'''SELECT id FROM "{cls._tombstones_table()}" WHERE id = ANY($1);''', (chunk,))
+                banned.update(row[0] for row in _DB._cursor.fetchall())
+        return banned
+
+    @classmethod
+    def is_banned(cls, id: str) -> bool:
+        return bool(cls.banned_ids([id]))
+
     @classmethod
     def unban(cls, ids: list[str] | None = None) -> None:
         with cls.DBContext:
             if ids is None:
-                _DB._cursor.execute(f'''DELETE FROM "{cls._TABLE_NAME}" WHERE status IS NULL;''')
+                _DB._cursor.execute(f'''DELETE FROM "{cls._tombstones_table()}";''')
                 _DB._db.commit()
                 cls.logger.warning(f'All ids unbanned.')
                 cls._E._cache.clear()
             else:
-                _DB._cursor.execute(f'''DELETE FROM "{cls._TABLE_NAME}" WHERE (id = ANY($1)) AND (status IS NULL);''', (ids,))
+                for chunk in utils.chunks(ids, cls.ARRAY_CHUNK_SIZE):
+                    _DB._cursor.execute(f'''DELETE FROM "{cls._tombstones_table()}" WHERE id = ANY($1);''', (chunk,))
                 _DB._db.commit()
                 cls.logger.warning(f'{len(ids)} ids unbanned.')
\ No newline at end of file
@@ -0,0 +1,300 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import typing as ty
+
+from contextlib import contextmanager
+from enum import Enum
+
+from src.modules.display import Logger
+
+from src.config import Paths
+from src import utils
+
+
+class JournalOps(Enum):
+    REGISTER_POST = 'register_post'
+    SKIP_POST = 'skip_post'
+
+
+class Journal:
+    """Local append-only journal of write commands, replayed in order by `flush` once the db is reachable."""
+
+    logger = Logger('[Journal]')
+    PENDING = 'pending.jsonl'
+    FLUSHING = 'flushing.jsonl'
+    CONFLICTS = 'conflicts.jsonl'
+    LOCK = 'flush.lock'
+    LOCK_TIMEOUT = 600    # seconds, a lock older than that was left by a dead flusher (when its PID cannot be checked)
+    ROTATE_LOCK = 'rotate.lock'
+    ROTATE_LOCK_TIMEOUT = 10    # seconds, only held for one append or one rename
+    RETRY_DELAY = 5.0
+    MAX_RETRY_DELAY = 300.0
+    MAX_ATTEMPTS = 20    # failed flushes in a row before a flusher gives up
+    FLUSHER_SCRIPT = os.path.join('main', 'flush_journal.py')
+
+    @classmethod
+    def _path(cls, name: str) -> str:
+        return os.path.join(Paths('journal').fs, name)
+
+    @staticmethod
+    def _append(path: str, entry: dict) -> None:
+        # One write on an O_APPEND descriptor, so concurrent writers never interleave lines
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, (json.dumps(entry) + '\n').encode('utf-8'))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _read(path: str) -> list[dict]:
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Torn last line of a crashed writer, nothing was acknowledged for it
+                    Journal.logger.warning(f'Invalid journal line ignored: {line}')
+        return entries
+
+    @classmethod
+    def record(cls, op: str | JournalOps, id: str, platform: str) -> dict:
+        """Durably records a write command, the date is the one of the intent, not of the replay."""
+        entry = {
+            'op': JournalOps(op).value,
+            'id': id,
+            'platform': platform.lower(),
+            'date': utils.date_to_str()
+        }
+        with cls._rotation():
+            cls._append(cls._path(cls.PENDING), entry)
+        cls.logger.info(f'Recorded {entry["op"]} for {id} on {entry["platform"]}')
+        return entry
+
+    @classmethod
+    def pending(cls) -> list[dict]:
+        return cls._read(cls._path(cls.FLUSHING)) + cls._read(cls._path(cls.PENDING))
+
+    @classmethod
+    def conflicts(cls) -> list[dict]:
+        return cls._read(cls._path(cls.CONFLICTS))
+
+    @classmethod
+    def spawn_flusher(cls) -> None:
+        """Starts a detached flusher process, the caller returns without waiting for the db."""
+        if os.name == 'nt':
+            kwargs = {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            kwargs = {'start_new_session': True}
+        subprocess.Popen(
+            [sys.executable, cls.FLUSHER_SCRIPT],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            **kwargs
+        )
+
+    @classmethod
+    def _acquire_lock(cls, name: str | None = None, timeout: float | None = None) -> bool:
+        path = cls._path(name or cls.LOCK)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                try:
+                    if not cls._lock_is_stale(path, timeout or cls.LOCK_TIMEOUT):
+                        return False
+                    cls.logger.warning(f'Stale journal lock removed: {name or cls.LOCK}')
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return True
+        return False
+
+    @staticmethod
+    def _lock_is_stale(path: str, timeout: float) -> bool:
+        """Left by a dead process: its PID is gone, or the lock is older than `timeout` when the PID cannot be probed."""
+        # os.kill cannot probe a process on Windows, the PID is not written yet right after the lock is created
+        if os.name != 'nt':
+            with open(path, 'r') as f:
+                pid = f.read().strip()
+            if pid.isdigit():
+                try:
+                    os.kill(int(pid), 0)
+                except ProcessLookupError:
+                    return True
+                except PermissionError:
+                    pass
+                return False
+        return time.time() - os.path.getmtime(path) >= timeout
+
+    @classmethod
+    def _refresh_lock(cls, name: str | None = None) -> None:
+        try:
+            os.utime(cls._path(name or cls.LOCK))
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def _release_lock(cls, name: str | None = None) -> None:
+        try:
+            os.remove(cls._path(name or cls.LOCK))
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    @contextmanager
+    def _rotation(cls) -> ty.Iterator[None]:
+        """Held around appends and the pending -> flushing rename, so a line never lands in a file already read."""
+        while not cls._acquire_lock(cls.ROTATE_LOCK, cls.ROTATE_LOCK_TIMEOUT):
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            cls._release_lock(cls.ROTATE_LOCK)
+
+    @classmethod
+    def _conflict(cls, entry: dict, reason: str) -> None:
+        cls._append(cls._path(cls.CONFLICTS), {'entry': entry, 'reason': reason, 'at': utils.date_to_str()})
+        cls.logger.warning(f'Journal conflict on {entry}: {reason}')
+
+    @classmethod
+    def _apply(cls, entry: dict, mvs: dict) -> str | None:
+        """Applies one entry on the loaded videos, returns the conflict reason if it cannot be applied."""
+        from src.dataproc.myvideo import MyVideo
+
+        op, id, platform, date = entry.get('op'), entry.get('id'), entry.get('platform', ''), entry.get('date', '')
+        try:
+            op = JournalOps(op)
+        except ValueError:
+            return f'Unknown operation: {op}'
+
+        mv = mvs.get(id) or MyVideo.load(id=id)
+        if mv is None:
+            return f'Video with ID "{id}" not found.'
+        mvs[id] = mv
+
+        # A replay after a crash between commit and cleanup finds its own write (which may have made the video DONE)
+        expected = date if op == JournalOps.REGISTER_POST else 'skipped'
+        if mv.publication_dates.get(platform) == expected:
+            return None
+
+        if mv.status == mv.statuses.DONE:
+            return f'{mv} is already DONE.'
+
+        try:
+            if op == JournalOps.REGISTER_POST:
+                result = mv.register_post(platform=platform, date=date)
+            else:
+                result = mv.skip_post(platform=platform)
+        except AssertionError as e:
+            return str(e)
+
+        if result is None:
+            return f'Platform "{platform}" not found for {mv}.'
+        elif result is False:
+            return f'{mv} was already {"registered" if op == JournalOps.REGISTER_POST else "skipped"} on {platform} ({mv.publication_dates.get(platform)}).'
+        return None
+
+    @classmethod
+    def _replay(cls, entries: list[dict]) -> tuple[int, int]:
+        from src.dataproc.com import UnitOfWork, _is_transient_error
+
+        mvs = {}
+        applied = 0
+        conflicts: list[tuple[dict, str]] = []
+        for entry in entries:
+            try:
+                reason = cls._apply(entry, mvs)
+            except Exception as e:
+                # The db being unreachable fails the batch, anything else only fails its entry
+                if _is_transient_error(e):
+                    raise
+                reason = f'{type(e).__name__}: {e}'
+            if reason is None:
+                applied += 1
+            else:
+                conflicts.append((entry, reason))
+
+        with UnitOfWork() as uow:
+            uow.save(list(mvs.values()))
+
+        # Reported only once the batch is committed, a failed flush retries the whole batch
+        for entry, reason in conflicts:
+            cls._conflict(entry, reason)
+        return applied, len(conflicts)
+
+    @classmethod
+    def flush(cls) -> tuple[int, int]:
+        """Replays the journal in order, returns the number of applied and conflicting entries."""
+        if not cls._acquire_lock():
+            cls.logger.info('Journal flush already running')
+            return 0, 0
+
+        applied = conflicts = 0
+        try:
+            flushing, pending = cls._path(cls.FLUSHING), cls._path(cls.PENDING)
+            while True:
+                cls._refresh_lock()
+                # A batch left by a failed flush goes first to keep the order
+                if not os.path.exists(flushing):
+                    if not os.path.exists(pending):
+                        break
+                    with cls._rotation():
+                        os.replace(pending, flushing)
+
+                entries = cls._read(flushing)
+                if entries:
+                    a, c = cls._replay(entries)
+                    applied += a
+                    conflicts += c
+                os.remove(flushing)
+        finally:
+            cls._release_lock()
+
+        if applied or conflicts:
+            cls.logger.info(f'Journal flushed: {applied} applied, {conflicts} conflicts')
+        return applied, conflicts
+
+    @classmethod
+    def is_empty(cls) -> bool:
+        return not (os.path.exists(cls._path(cls.FLUSHING)) or os.path.exists(cls._path(cls.PENDING)))
+
+    @classmethod
+    def flush_until_empty(cls) -> tuple[int, int]:
+        """`flush` again, with an exponential backoff, until the journal is empty or `MAX_ATTEMPTS` flushes failed in a row."""
+        applied = conflicts = 0
+        delay = cls.RETRY_DELAY
+        failures = 0
+        while True:
+            try:
+                a, c = cls.flush()
+                applied += a
+                conflicts += c
+            except Exception as e:
+                failures += 1
+                if failures >= cls.MAX_ATTEMPTS:
+                    cls.logger.error(f'Journal flush given up after {failures} failed attempts, the journal is kept: {e}')
+                    break
+                cls.logger.warning(f'Journal flush failed, retrying in {delay:.0f}s: {e}')
+            else:
+                failures = 0
+                # Nothing left, or another flusher holds the lock and may exit before seeing the last entries
+                if cls.is_empty():
+                    break
+            time.sleep(delay)
+            delay = min(delay * 2, cls.MAX_RETRY_DELAY)
+        return applied, conflicts
@@ -1,7 +1,11 @@
 import asyncio
+import json
+import os
+import typing as ty
 
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 from enum import Enum
+from functools import lru_cache
 
 from src.modules.paths import PathLike, Path
 from src.modules.display import Logger
@@ -11,10 +15,10 @@ from src.cloud.megacloud import MegaCloud
 
 from src.config import Paths, VideoFFMPEGBuilder
 from src import utils
-from src.dataproc.com import _ComE, _ComES, DBContext
+from src.dataproc.com import _ComE, _ComES, DBContext, EntityCache, QueryCache
 
-from src.uploaders import UPLOADERS
-from src.dataproc.accounts import get_platforms
+from src.uploaders import get_account_uploaders, get_account_uploader_names
+from src.dataproc.accounts import get_platform_registry, get_accounts, on_accounts_changed
 from src.niches import COMMON_NICHE
 
 
@@ -23,11 +27,15 @@ class Global(metaclass=GlobalPostLoad):
     def mega() -> MegaCloud:
         mega = MegaCloud(Paths.getenv('MEGA_UNIQUENAME'))
         mega.login()
-        mega.create_folder('content_automation/_auto_')
+        mega.create_folder(_M.CLOUD_ROOT)
         return mega
     mega: MegaCloud
 
 
+# URLs are parsed once per process, the same ones are looked up again and again
+_video_info = lru_cache(maxsize=8192)(utils.extract_video_info)
+
+
 class Statuses(Enum):
     BANNED = 'BANNED'
     PROCESSING = DEFAULT = 'PROCESSING'
@@ -44,31 +52,414 @@ class UploadStatuses(Enum):
     UPLOADED = 'UPLOADED'
 
 
+class PublicationDates(dict):
+    """publication_dates (platform -> date string) with every value parsed once, when it is set."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._parsed: dict[str, tuple[UploadStatuses, datetime | None]] = {pl: self._parse(d) for pl, d in self.items()}
+
+    @staticmethod
+    def _parse(date: str) -> tuple[UploadStatuses, datetime | None]:
+        if not date:
+            return UploadStatuses.INITIATED, None
+        try:
+            return UploadStatuses.UPLOADED, utils.str_to_date(date)
+        except ValueError:
+            return UploadStatuses.SKIPPED, None
+
+    def __setitem__(self, platform: str, date: str) -> None:
+        super().__setitem__(platform, date)
+        self._parsed[platform] = self._parse(date)
+
+    def __delitem__(self, platform: str) -> None:
+        super().__delitem__(platform)
+        del self._parsed[platform]
+
+    def pop(self, platform: str, *default) -> str:
+        self._parsed.pop(platform, None)
+        return super().pop(platform, *default)
+
+    def popitem(self) -> tuple[str, str]:
+        item = super().popitem()
+        del self._parsed[item[0]]
+        return item
+
+    def setdefault(self, platform: str, date: str = '') -> str:
+        if platform not in self:
+            self[platform] = date
+        return self[platform]
+
+    def update(self, *args, **kwargs) -> None:
+        for platform, date in dict(*args, **kwargs).items():
+            self[platform] = date
+
+    def __ior__(self, other) -> 'PublicationDates':
+        self.update(other)
+        return self
+
+    def clear(self) -> None:
+        super().clear()
+        self._parsed.clear()
+
+    def copy(self) -> 'PublicationDates':
+        return PublicationDates(self)
+
+    __copy__ = copy
+
+    def __reduce__(self) -> tuple:
+        # copy.deepcopy and pickle rebuild `_parsed` from the items instead of sharing or missing it
+        return PublicationDates, (dict(self),)
+
+    def state(self, platform: str) -> UploadStatuses | None:
+        """Upload status of `platform`, None when it is not processed yet."""
+        parsed = self._parsed.get(platform)
+        return None if parsed is None else parsed[0]
+
+    def date(self, platform: str) -> datetime | None:
+        parsed = self._parsed.get(platform)
+        return None if parsed is None else parsed[1]
+
+    @property
+    def parsed(self) -> dict[str, tuple[UploadStatuses, datetime | None]]:
+        return dict(self._parsed)
+
+    @property
+    def dates(self) -> dict[str, datetime]:
+        """Upload dates of the uploaded platforms."""
+        return {pl: d for pl, (_, d) in self._parsed.items() if d is not None}
+
+
 class _M:
 
     logger = Logger('[MyVideo]')
     parent_path = Paths('content_created/FINAL')
     statuses: type[Statuses] = Statuses
-    _cache = set()
+    _cache = EntityCache()
     uploadstatuses: type[UploadStatuses] = UploadStatuses
     DEFAULT_QUALITY = 'HQ'
     DEFAULT_CLOUD = 'mega'
+    _EVENTS_TABLE_NAME = 'post_events'
+    _STATUS_COUNTS_TABLE_NAME = 'status_counts'
+    _EVENT_COUNTS_TABLE_NAME = 'post_event_counts'
+    _QUEUE_TABLE_NAME = 'post_queue'
+    _POST_DAYS_TABLE_NAME = 'post_days'
+    _POST_DAY_COUNTS_TABLE_NAME = 'post_day_counts'
+    _PARSE_DATE_FUNCTION = 'parse_video_date'
+    _SNAPSHOT_DICT_COLUMNS = ('status', 'niche', 'account')
+    # Small working set apart from the ever-growing tail of DONE videos, queries on a status only scan their partition.
+    # BANNED videos have their own so that retention can drop them at once (`drop_partition('banned')`)
+    _PARTITION_KEY = 'status'
+    _PARTITIONS = {
+        'active': (Statuses.PROCESSING.value, Statuses.FLAGGED.value, Statuses.READY.value),
+        'done': (Statuses.DONE.value,),
+        'banned': (Statuses.BANNED.value,)
+    }
+    _SWEPT_STATUSES = (Statuses.BANNED.name, Statuses.DONE.name)
+    CLOUD_ROOT = 'content_automation/_auto_'
 
     @classproperty
     def EXT(cls) -> str:
         return VideoFFMPEGBuilder.OPTIONS[cls.DEFAULT_QUALITY]['extension']
 
+    @classmethod
+    def create_table(cls) -> None:
+        super().create_table()
+        with cls.DBContext:
+            cls._cursor.execute('SELECT to_regclass($1);', (cls._EVENTS_TABLE_NAME,))
+            events_exists = cls._cursor.fetchone()[0] is not None
+
+            # utils.str_to_date in SQL (fraction of second included), NULL instead of an error for anything else
+            cls._cursor.execute(f'''
+                CREATE OR REPLACE FUNCTION "{cls._PARSE_DATE_FUNCTION}"(value TEXT) RETURNS TIMESTAMP LANGUAGE plpgsql STABLE AS $$
+                BEGIN
+                    IF value !~ '^[0-9]{{2}}-[0-9]{{2}}-[0-9]{{4}}_[0-9]{{2}}-[0-9]{{2}}-[0-9]{{2}}-[0-9]{{1,6}}$' THEN
+                        RETURN NULL;
+                    END IF;
+                    RETURN to_timestamp(left(value, 19), 'DD-MM-YYYY_HH24-MI-SS')::timestamp
+                        + ('0.' || substr(value, 21))::numeric * interval '1 second';
+                EXCEPTION WHEN others THEN
+                    RETURN NULL;
+                END $$;
+            ''')
+
+            # One row per (video, platform), a missing row means the platform is not processed yet
+            cls._cursor.execute(f'''
+                DO $$ BEGIN
+                    CREATE TYPE post_state AS ENUM ({', '.join(f"'{us.value}'" for us in (UploadStatuses.INITIATED, UploadStatuses.SKIPPED, UploadStatuses.UPLOADED))});
+                EXCEPTION WHEN duplicate_object THEN NULL;
+                END $$;
+            ''')
+            cls._cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS "{cls._EVENTS_TABLE_NAME}" (
+                    video_id TEXT NOT NULL,
+                    platform TEXT NOT NULL,
+                    account TEXT NOT NULL DEFAULT '',
+                    state post_state NOT NULL,
+                    at TIMESTAMP,
+                    PRIMARY KEY (video_id, platform)
+                );
+            ''')
+
+            if not events_exists:
+                cls._events_from_rows(cls._cursor)
+                cls.logger.info(f'{cls._EVENTS_TABLE_NAME} table created from publication_dates.')
+
+            cls._cursor.execute('SELECT to_regclass($1);', (cls._QUEUE_TABLE_NAME,))
+            queue_exists = cls._cursor.fetchone()[0] is not None
+
+            # READY videos with INITIATED platforms, in get_new_post order: most INITIATED platforms, then oldest
+            cls._cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS "{cls._QUEUE_TABLE_NAME}" (
+                    video_id TEXT PRIMARY KEY,
+                    account TEXT NOT NULL DEFAULT '',
+                    initiated INTEGER NOT NULL,
+                    created TIMESTAMP NOT NULL
+                );
+            ''')
+
+            if not queue_exists:
+                cls._queue_from_rows(cls._cursor)
+                cls.logger.info(f'{cls._QUEUE_TABLE_NAME} table created from {cls._EVENTS_TABLE_NAME}.')
+
+            cls._cursor.execute('SELECT to_regclass($1);', (cls._POST_DAYS_TABLE_NAME,))
+            post_days_exists = cls._cursor.fetchone()[0] is not None
+
+            # Completely posted videos (READY or DONE) and the day of their last upload, counted per (account, day)
+            cls._cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS "{cls._POST_DAYS_TABLE_NAME}" (
+                    video_id TEXT PRIMARY KEY,
+                    account TEXT NOT NULL DEFAULT '',
+                    day DATE NOT NULL
+                );
+            ''')
+
+            if not post_days_exists:
+                cls._post_days_from_rows(cls._cursor)
+                cls.logger.info(f'{cls._POST_DAYS_TABLE_NAME} table created from {cls._EVENTS_TABLE_NAME}.')
+
+            cls._create_counts()
+            cls._db.commit()
+
+    @classmethod
+    def _events_from_rows(cls, cursor, ids = None) -> None:
+        """Derives post_events from the stored publication_dates, of every row when `ids` is None."""
+        query = f'''
+            INSERT INTO "{cls._EVENTS_TABLE_NAME}" (video_id, platform, account, state, at)
+            SELECT v.id, e.key, COALESCE(v.account, ''),
+                (CASE WHEN e.value = '' THEN 'INITIATED'
+                      WHEN "{cls._PARSE_DATE_FUNCTION}"(e.value) IS NOT NULL THEN 'UPLOADED'
+                      ELSE 'SKIPPED' END)::post_state,
+                "{cls._PARSE_DATE_FUNCTION}"(e.value)
+            FROM "{cls._TABLE_NAME}" v, jsonb_each_text(v.publication_dates) e
+            WHERE (v.publication_dates IS NOT NULL){'' if ids is None else ' AND v.id = ANY($1)'}
+            ON CONFLICT DO NOTHING;
+        '''
+        if ids is None:
+            cursor.execute(query)
+        else:
+            for chunk in utils.chunks(ids, cls.ARRAY_CHUNK_SIZE):
+                cursor.execute(query, (chunk,))
+
+    @classmethod
+    def _queue_from_rows(cls, cursor, ids = None) -> None:
+        """Derives post_queue from the rows and their post_events, of every row when `ids` is None."""
+        params = []
+        uploaders = cls._uploaders_sql(params)
+        query = f'''
+            INSERT INTO "{cls._QUEUE_TABLE_NAME}" (video_id, account, initiated, created)
+            SELECT v.id, COALESCE(v.account, ''), count(*),
+                COALESCE("{cls._PARSE_DATE_FUNCTION}"(v.creation_date), 'infinity'::timestamp)
+            FROM "{cls._TABLE_NAME}" v JOIN "{cls._EVENTS_TABLE_NAME}" e ON e.video_id = v.id
+            WHERE v.status = '{Statuses.READY.value}' AND e.state = '{UploadStatuses.INITIATED.value}'
+                AND e.platform = ANY({uploaders}){'' if ids is None else f' AND v.id = ANY(${len(params) + 1})'}
+            GROUP BY v.id, v.account, v.creation_date
+            ON CONFLICT (video_id) DO UPDATE SET account = excluded.account, initiated = excluded.initiated, created = excluded.created;
+        '''
+        if ids is None:
+            cursor.execute(query, params)
+        else:
+            for chunk in utils.chunks(ids, cls.ARRAY_CHUNK_SIZE):
+                cursor.execute(query, (*params, chunk))
+
+    @classmethod
+    def _post_days_from_rows(cls, cursor, ids = None) -> None:
+        """Derives post_days from the rows and their post_events, of every row when `ids` is None."""
+        params = []
+        is_posted = cls._is_posted_sql(params)
+        query = f'''
+            INSERT INTO "{cls._POST_DAYS_TABLE_NAME}" (video_id, account, day)
+            SELECT v.id, COALESCE(v.account, ''), max(e.at)::date
+            FROM "{cls._TABLE_NAME}" v JOIN "{cls._EVENTS_TABLE_NAME}" e ON e.video_id = v.id
+            WHERE v.status IN ('{Statuses.READY.value}', '{Statuses.DONE.value}') AND e.at IS NOT NULL
+                AND {is_posted}{'' if ids is None else f' AND v.id = ANY(${len(params) + 1})'}
+            GROUP BY v.id, v.account
+            ON CONFLICT (video_id) DO UPDATE SET account = excluded.account, day = excluded.day;
+        '''
+        if ids is None:
+            cursor.execute(query, params)
+        else:
+            for chunk in utils.chunks(ids, cls.ARRAY_CHUNK_SIZE):
+                cursor.execute(query, (*params, chunk))
+
+    @classmethod
+    def _create_counts(cls) -> None:
+        """Counts tables maintained by row triggers."""
+        counted = {
+            # counts table: (counted table, group columns, column types)
+            cls._STATUS_COUNTS_TABLE_NAME: (cls._TABLE_NAME, ('account', 'status'), ('TEXT', 'TEXT')),
+            cls._EVENT_COUNTS_TABLE_NAME: (cls._EVENTS_TABLE_NAME, ('account', 'platform', 'state'), ('TEXT', 'TEXT', 'post_state')),
+            cls._POST_DAY_COUNTS_TABLE_NAME: (cls._POST_DAYS_TABLE_NAME, ('account', 'day'), ('TEXT', 'DATE'))
+        }
+        for counts_table, (table, keys, types) in counted.items():
+            cls._cursor.execute('SELECT to_regclass($1);', (counts_table,))
+            counts_exists = cls._cursor.fetchone()[0] is not None
+
+            cls._cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS "{counts_table}" (
+                    {', '.join(f'{k} {t} NOT NULL' for k, t in zip(keys, types))},
+                    n BIGINT NOT NULL DEFAULT 0,
+                    PRIMARY KEY ({', '.join(keys)})
+                );
+            ''')
+
+            # Rows with a NULL group key are not counted
+            old_keys = ', '.join(f"COALESCE(OLD.{k}, '')" if k == 'account' else f'OLD.{k}' for k in keys)
+            new_keys = ', '.join(f"COALESCE(NEW.{k}, '')" if k == 'account' else f'NEW.{k}' for k in keys)
+            cls._cursor.execute(f'''
+                CREATE OR REPLACE FUNCTION "{counts_table}_sync"() RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP <> 'INSERT' THEN
+                        IF {' AND '.join(f'OLD.{k} IS NOT NULL' for k in keys if k != 'account')} THEN
+                            UPDATE "{counts_table}" SET n = n - 1
+                            WHERE ({', '.join(keys)}) = ({old_keys});
+                        END IF;
+                    END IF;
+                    IF TG_OP <> 'DELETE' THEN
+                        IF {' AND '.join(f'NEW.{k} IS NOT NULL' for k in keys if k != 'account')} THEN
+                            INSERT INTO "{counts_table}" ({', '.join(keys)}, n) VALUES ({new_keys}, 1)
+                            ON CONFLICT ({', '.join(keys)}) DO UPDATE SET n = "{counts_table}".n + 1;
+                        END IF;
+                    END IF;
+                    RETURN NULL;
+                END $$;
+            ''')
+
+            cls._cursor.execute('SELECT tgname FROM pg_trigger WHERE tgrelid = to_regclass($1) AND NOT tgisinternal;', (table,))
+            triggers = {row[0] for row in cls._cursor.fetchall()}
+            if f'{counts_table}_insert_delete' not in triggers:
+                cls._cursor.execute(f'''
+                    CREATE TRIGGER "{counts_table}_insert_delete" AFTER INSERT OR DELETE ON "{table}"
+                    FOR EACH ROW EXECUTE FUNCTION "{counts_table}_sync"();
+                ''')
+            if f'{counts_table}_update' not in triggers:
+                # Upserts rewrite every column, only rows changing group are worth a trigger call
+                cls._cursor.execute(f'''
+                    CREATE TRIGGER "{counts_table}_update" AFTER UPDATE ON "{table}"
+                    FOR EACH ROW WHEN (({', '.join(f'OLD.{k}' for k in keys)}) IS DISTINCT FROM ({', '.join(f'NEW.{k}' for k in keys)}))
+                    EXECUTE FUNCTION "{counts_table}_sync"();
+                ''')
+
+            if not counts_exists:
+                # Writers wait until the backfill is committed, so no change is counted twice or missed
+                cls._cursor.execute(f'LOCK TABLE "{table}" IN SHARE ROW EXCLUSIVE MODE;')
+                cls._cursor.execute(f'''
+                    INSERT INTO "{counts_table}" ({', '.join(keys)}, n)
+                    SELECT {', '.join("COALESCE(account, '')" if k == 'account' else k for k in keys)}, count(*) FROM "{table}"
+                    WHERE {' AND '.join(f'{k} IS NOT NULL' for k in keys if k != 'account')}
+                    GROUP BY 1{''.join(f', {i}' for i in range(2, len(keys) + 1))};
+                ''')
+                cls.logger.info(f'{counts_table} table created from {table}.')
+
     @classmethod
     def create_indexs(cls) -> None:
         with cls.DBContext:
             cls._cursor.execute(f'''CREATE INDEX IF NOT EXISTS idx_status ON "{cls._TABLE_NAME}" (status);''')
             cls._cursor.execute(f'''CREATE INDEX IF NOT EXISTS idx_account ON "{cls._TABLE_NAME}" (account);''')
             cls._cursor.execute(f'''CREATE INDEX IF NOT EXISTS idx_status_account ON "{cls._TABLE_NAME}" (status, account);''')
+            cls._cursor.execute(f'''CREATE INDEX IF NOT EXISTS idx_events_platform_state ON "{cls._EVENTS_TABLE_NAME}" (platform, state);''')
+            cls._cursor.execute(f'''CREATE INDEX IF NOT EXISTS idx_events_account_state ON "{cls._EVENTS_TABLE_NAME}" (account, state);''')
+            # Narrow indexes for the phone's hot queries: READY videos of an account, platforms left to post
+            cls._cursor.execute(f'''CREATE INDEX IF NOT EXISTS idx_ready_account ON "{cls._TABLE_NAME}" (account) WHERE status = '{Statuses.READY.value}';''')
+            cls._cursor.execute(f'''CREATE INDEX IF NOT EXISTS idx_events_initiated ON "{cls._EVENTS_TABLE_NAME}" (account, platform) WHERE state = '{UploadStatuses.INITIATED.value}';''')
+            # Queue heads are read in index order, popping the next post never sorts the queue
+            cls._cursor.execute(f'''CREATE INDEX IF NOT EXISTS idx_queue_order ON "{cls._QUEUE_TABLE_NAME}" (initiated DESC, created, video_id);''')
+            cls._cursor.execute(f'''CREATE INDEX IF NOT EXISTS idx_queue_account_order ON "{cls._QUEUE_TABLE_NAME}" (account, initiated DESC, created, video_id);''')
             cls._db.commit()
 
+    @classmethod
+    def _flush_saves(cls, cursor, objs, batch_size = None) -> None:
+        super()._flush_saves(cursor, objs, batch_size=batch_size)
+        # Keep post_events in the same transaction as the rows they are derived from
+        cls._delete_dependents(cursor, [o.id for o in objs])
+        events = [{'video_id': o.id, 'account': o.account, **e} for o in objs for e in o.post_events]
+        if events:
+            cursor.execute(f'''
+                INSERT INTO "{cls._EVENTS_TABLE_NAME}" (video_id, platform, account, state, at)
+                SELECT video_id, platform, account, state, at
+                FROM jsonb_to_recordset($1::jsonb)
+                    AS e(video_id TEXT, platform TEXT, account TEXT, state post_state, at TIMESTAMP);
+            ''', (json.dumps(events, separators=(',', ':')),))
+            cls._queue_from_rows(cursor, [o.id for o in objs])
+            cls._post_days_from_rows(cursor, [o.id for o in objs])
+
+    @classmethod
+    def _uploaders_sql(cls, params) -> str:
+        """Uploader names of the account of the row `v` as a SQL array, the accounts parameter is appended to `params`."""
+        params.append(json.dumps({a.uniquename: sorted(get_account_uploader_names(a.uniquename)) for a in get_accounts()}))
+        return f"ARRAY(SELECT jsonb_array_elements_text((${len(params)}::jsonb) -> v.account))"
+
+    @classmethod
+    def _is_posted_sql(cls, params) -> str:
+        """MyVideo.is_posted of the row `v` in SQL, parameters are appended to `params`."""
+        uploaders = cls._uploaders_sql(params)
+        return (f"(cardinality({uploaders}) > 0 AND v.publication_dates IS NOT NULL AND v.publication_dates <> '{{}}'::jsonb"
+                f" AND NOT EXISTS (SELECT 1 FROM jsonb_each_text(v.publication_dates) e WHERE e.value = '')"
+                f" AND v.publication_dates ?& {uploaders})")
+
+    @classmethod
+    def _transition_status_sql(cls, status, params) -> str:
+        # MyVideo.update_status in SQL: DONE needs every uploader posted (FLAGGED otherwise), posted videos are DONE
+        params.append(status.value)
+        status_param = f'${len(params)}::text'
+        is_posted = cls._is_posted_sql(params)
+        return f'''(CASE WHEN {status_param} = '{Statuses.DONE.value}' AND NOT {is_posted} THEN '{Statuses.FLAGGED.value}'
+                      WHEN {is_posted} THEN '{Statuses.DONE.value}'
+                      ELSE {status_param} END)'''
+
+    @classmethod
+    def _import_rows(cls, cursor, rows) -> None:
+        super()._import_rows(cursor, rows)
+        # Raw rows skip the objects, events are derived from the stored publication_dates instead
+        ids = [r['id'] for r in rows]
+        cls._delete_dependents(cursor, ids)
+        cls._events_from_rows(cursor, ids)
+        cls._queue_from_rows(cursor, ids)
+        cls._post_days_from_rows(cursor, ids)
+
+    @classmethod
+    def _refresh_dependents(cls, cursor, ids) -> None:
+        # Only the status changed, post_events still hold
+        for table in (cls._QUEUE_TABLE_NAME, cls._POST_DAYS_TABLE_NAME):
+            for chunk in utils.chunks(ids, cls.ARRAY_CHUNK_SIZE):
+                cursor.execute(f'''DELETE FROM "{table}" WHERE video_id = ANY($1);''', (chunk,))
+        cls._queue_from_rows(cursor, ids)
+        cls._post_days_from_rows(cursor, ids)
+
+    @classmethod
+    def _delete_dependents(cls, cursor, ids = None) -> None:
+        for table in (cls._EVENTS_TABLE_NAME, cls._QUEUE_TABLE_NAME, cls._POST_DAYS_TABLE_NAME):
+            if ids is None:
+                cursor.execute(f'''DELETE FROM "{table}";''')
+            else:
+                for chunk in utils.chunks(ids, cls.ARRAY_CHUNK_SIZE):
+                    cursor.execute(f'''DELETE FROM "{table}" WHERE video_id = ANY($1);''', (chunk,))
+
 
 class MyVideo(_M, _ComE):
 
+    _UNSAFE_ACCOUNT_CHARS = frozenset(r' %&?#[]{}<>\\^`"\'|@:+,;=')
+
     def __init__(self,
             id: str = None,
             creation_date: str | None = None,
@@ -95,7 +486,7 @@ class MyVideo(_M, _ComE):
         self.OCR = OCR or ''
         self.niche = niche or ''
 
-        self.publication_dates: dict[str, str] = publication_dates or {}
+        self.publication_dates = publication_dates
         if self.status == self.statuses.DONE and not self.publication_dates:
             self.publication_dates = {u.name: utils.date_to_str() for u in self.uploaders}
     
@@ -104,19 +495,66 @@ class MyVideo(_M, _ComE):
         self.scene_ids = scene_ids or []
         self._scenes = None
 
-        self.path = self.parent_path * self.id
-        self.uncompressed_path = self.path * (f"{self.id}_uncompressed{VideoFFMPEGBuilder.OPTIONS[self.DEFAULT_QUALITY]['extension']}")
+        # Built on first use, most loaded videos never touch their files
+        self._path = None
+        self._uncompressed_path = None
+        self._manifest = None
 
         self.status = self.status    # Use property setter for updates
 
+    @property
+    def path(self) -> PathLike:
+        if self._path is None:
+            self._path = self.parent_path * self.id
+        return self._path
+
+    @property
+    def uncompressed_path(self) -> PathLike:
+        if self._uncompressed_path is None:
+            self._uncompressed_path = self.path * self.uncompressed_filename
+        return self._uncompressed_path
+
+    @property
+    def urls(self) -> list[str]:
+        return self._urls
+
+    @urls.setter
+    def urls(self, value: list[str]) -> None:
+        self._urls = value
+        self._url_index = None
+
+    @property
+    def publication_dates(self) -> PublicationDates:
+        return self._publication_dates
+
+    @publication_dates.setter
+    def publication_dates(self, value: dict[str, str] | None) -> None:
+        self._publication_dates = value if isinstance(value, PublicationDates) else PublicationDates(value or {})
+
+    @property
+    def uncompressed_filename(self) -> str:
+        return f"{self.id}_uncompressed{self.EXT}"
+
+    @property
+    def files(self) -> frozenset[str]:
+        """Names of the files of the video directory, cached by directory mtime."""
+        try:
+            mtime = os.stat(self.path.fs).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            self._manifest = None
+            return frozenset()
+        if self._manifest is None or self._manifest[0] != mtime:
+            with os.scandir(self.path.fs) as entries:
+                self._manifest = (mtime, frozenset(e.name for e in entries if e.is_file()))
+        return self._manifest[1]
+
     @property
     def account(self) -> str:
         return self._account
     
     @account.setter
     def account(self, value: str) -> None:
-        unsafe_chars = set(r' %&?#[]{}<>\\^`"\'|@:+,;=')
-        if any(char in unsafe_chars for char in value):
+        if not self._UNSAFE_ACCOUNT_CHARS.isdisjoint(value):
             raise ValueError(f"Unsafe account name: '{value}' not allowed.")
         self._account = value
 
@@ -140,34 +578,31 @@ class MyVideo(_M, _ComE):
         # MyVideo with no uploaders can not be treated, and even more considered as posted
         if (((self.status == self.statuses.DONE and (not self.is_posted)))):
             self._status = self.statuses.FLAGGED
-        elif self.uploaders and self.is_posted:
+        elif self.uploader_names and self.is_posted:
             self._status = self.statuses.DONE
 
     def delete(self, archive = False, remove_file = True, send_to_trash = False, not_exists_ok = True):
         self.delete_from_mega(skip_errors=True)
         return super().delete(archive, remove_file=remove_file, send_to_trash=send_to_trash, not_exists_ok=not_exists_ok)
 
-    def banned(self) -> None:
-        self.update_status()
-        if self.status != self.statuses.BANNED:
-            return
-        self.delete(archive=False, remove_file=True, send_to_trash=True, not_exists_ok=True)
-    
-    def done(self) -> None:
+    def _sweep_candidate(self) -> bool:
         self.update_status()
+        if self.status == self.statuses.BANNED:
+            return True
         if self.status != self.statuses.DONE:
-            return
-        
-        valid_dates = []
-        for d in self.publication_dates.values():
-            try:
-                d = utils.str_to_date(d)
-            except ValueError:
-                continue
-            valid_dates.append(d)
+            return False
+
+        valid_dates = list(self.publication_dates.dates.values())
 
         # Use (not self.publication_dates) to prevent removing videos with only initiated statuses (invalid date format)
-        if (not self.publication_dates) or ((max(valid_dates) + timedelta(days=31)) < utils.str_to_date()):
+        return (not self.publication_dates) or ((max(valid_dates) + timedelta(days=31)) < utils.str_to_date())
+
+    def banned(self) -> None:
+        if self._sweep_candidate() and self.status == self.statuses.BANNED:
+            self.delete(archive=False, remove_file=True, send_to_trash=True, not_exists_ok=True)
+    
+    def done(self) -> None:
+        if self._sweep_candidate() and self.status == self.statuses.DONE:
             self.delete(archive=False, remove_file=True, send_to_trash=True, not_exists_ok=True)
 
     def update_data(self) -> None:
@@ -175,14 +610,13 @@ class MyVideo(_M, _ComE):
 
     @property
     def valid_publication_dates(self) -> dict[str, str]:
-        valid_dates = {}
-        for pl, d in self.publication_dates.items():
-            try:
-                utils.str_to_date(d)
-            except ValueError:
-                continue
-            valid_dates[pl] = d
-        return valid_dates
+        return {pl: self.publication_dates[pl] for pl in self.publication_dates.dates}
+
+    @property
+    def post_events(self) -> list[dict]:
+        """Normalized form of publication_dates stored in the post_events table."""
+        return [{'platform': pl, 'state': state.value, 'at': None if at is None else at.isoformat()}
+                for pl, (state, at) in self.publication_dates.parsed.items()]
 
     @property
     def caption(self) -> str:
@@ -190,11 +624,15 @@ class MyVideo(_M, _ComE):
 
     @property
     def is_exported(self) -> bool:
-        return self.uncompressed_path.exists
+        return self.uncompressed_filename in self.files
     
     @property
     def uploaders(self):
-        return [u for u in UPLOADERS if self.account in u.get_account_uniquenames()]
+        return get_account_uploaders(self.account)
+
+    @property
+    def uploader_names(self) -> frozenset[str]:
+        return get_account_uploader_names(self.account)
     
     @property
     def unprocessed_uploaders(self):
@@ -203,22 +641,16 @@ class MyVideo(_M, _ComE):
     
     @property
     def is_posted(self) -> bool:
-        if (not self.uploaders) or (not self.publication_dates):
+        uploader_names = self.uploader_names
+        if (not uploader_names) or (not self.publication_dates):
             return False
-        
-        uploader_names = {u.name for u in self.uploaders}
-
-        for pl, date in self.publication_dates.items():
-            if not date:
-                return False
-            elif pl in uploader_names:
-                uploader_names.remove(pl)
-        return not uploader_names
+
+        # No initiated (empty) date left and every uploader processed
+        return all(self.publication_dates.values()) and uploader_names.issubset(self.publication_dates)
     
     def cancel_post(self, platform: str) -> bool:
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
-        if platform not in {u.name for u in self.uploaders}:
+        platform = get_platform_registry().check(platform)
+        if platform not in self.uploader_names:
             return None
         
         self.remove_url(platform)
@@ -240,9 +672,8 @@ class MyVideo(_M, _ComE):
         if self.status != self.statuses.READY:
             return False
         
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
-        if platform not in {u.name for u in self.uploaders}:
+        platform = get_platform_registry().check(platform)
+        if platform not in self.uploader_names:
             return None
         
         if cloud == 'default':
@@ -264,9 +695,8 @@ class MyVideo(_M, _ComE):
         if self.status != self.statuses.READY:
             return False
 
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
-        if platform not in {u.name for u in self.uploaders}:
+        platform = get_platform_registry().check(platform)
+        if platform not in self.uploader_names:
             return None
         
         if self.get_upload_status(platform) == self.uploadstatuses.UPLOADED:
@@ -287,9 +717,8 @@ class MyVideo(_M, _ComE):
         if self.status != self.statuses.READY:
             return False
 
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
-        if platform not in {u.name for u in self.uploaders}:
+        platform = get_platform_registry().check(platform)
+        if platform not in self.uploader_names:
             return None
         
         self.remove_url(platform)
@@ -308,47 +737,34 @@ class MyVideo(_M, _ComE):
         if not platform:
             return self.uploadstatuses.UNPROCESSED
         
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
+        platform = get_platform_registry().check(platform)
 
-        if platform in self.publication_dates:
-            date = self.publication_dates[platform]
-            if not date:
-                return self.uploadstatuses.INITIATED
-            try:
-                utils.str_to_date(date)
-                return self.uploadstatuses.UPLOADED
-            except ValueError:
-                # Use any placeholders to indicate that the post was skipped (not empty, but invalid date)
-                return self.uploadstatuses.SKIPPED
-
-        elif self.path.exists:
-            for p in self.path:
-                if p.full_name == self.get_post_filename(platform):
-                    return self.uploadstatuses.READY
+        # Any placeholder (not empty, but invalid date) indicates that the post was skipped
+        if (state := self.publication_dates.state(platform)) is not None:
+            return state
+
+        elif self.get_post_filename(platform) in self.files:
+            return self.uploadstatuses.READY
 
         return self.uploadstatuses.UNPROCESSED
     
     def get_converted_path(self, platform: str, assert_exists: bool = False) -> PathLike | None:
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
+        platform = get_platform_registry().check(platform)
 
         p = self.path * self.get_post_filename(platform)
 
-        if assert_exists and not p.exists:
+        if assert_exists and p.full_name not in self.files:
             raise FileNotFoundError(f'{platform} converted video not found.')
         
         return p
     
     def get_post_filename(self, platform: str) -> str:
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
+        platform = get_platform_registry().check(platform)
 
-        return f"{platform}={self.account}={self.id}{VideoFFMPEGBuilder.OPTIONS[platform]['extension']}"    
+        return get_platform_registry().post_filename(platform, self.account, self.id)
         
     def get_post_info(self, platform: str) -> dict:
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
+        platform = get_platform_registry().check(platform)
 
         return {
             "id": self.id,
@@ -358,40 +774,47 @@ class MyVideo(_M, _ComE):
             "song": ""    # TODO: Add song
         }
     
+    @property
+    def urls_by_platform(self) -> dict[str, str]:
+        """platform -> first url of that platform."""
+        if self._url_index is None:
+            self._url_index = {}
+            for url in self.urls:
+                if (platform := _video_info(url)[0]):
+                    self._url_index.setdefault(platform, url)
+        return self._url_index
+
     def get_url(self, platform: str) -> str | None:
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
+        platform = get_platform_registry().check(platform)
 
-        for url in self.urls:
-            if platform == utils.extract_video_info(url)[0]:
-                return url
-        return None
+        return self.urls_by_platform.get(platform)
     
     def add_url(self, url: str, override: bool = True) -> str | None:
-        platform = utils.extract_video_info(url)[0]
+        platform = _video_info(url)[0]
         if not platform:
             return None
-        if (existing_url := self.get_url(platform)) is not None:
+        if (existing_url := self.urls_by_platform.get(platform)) is not None:
             if override:
                 self.urls.remove(existing_url)
             else:
                 return existing_url
         self.urls.append(url)
+        self._url_index = None
         return url
     
     def remove_url(self, platform: str) -> str | None:
-        platform = platform.lower()
-        assert platform in get_platforms(), f'Invalid platform: {platform}'
-
-        url_found = None
-        for url in self.urls:
-            if platform == utils.extract_video_info(url)[0]:
-                url_found = url
-                break
+        platform = get_platform_registry().check(platform)
+
+        url_found = self.urls_by_platform.get(platform)
         if url_found is not None:
             self.urls.remove(url_found)
+            self._url_index = None
         return url_found
     
+    @property
+    def cloud_path(self) -> PathLike:
+        return Path(f'{self.CLOUD_ROOT}/{self.path.name}', 'Directory')
+
     async def send_to_mega_async(self,
             platforms: str | list[str] | None = None,
             skip_on_exists: bool = True,
@@ -405,13 +828,13 @@ class MyVideo(_M, _ComE):
                 platforms = [platforms]
         
             [pl.lower() for pl in platforms]
-            assert all(pl in get_platforms() for pl in platforms), f'Invalid platform'
+            assert all(pl in get_platform_registry() for pl in platforms), f'Invalid platform'
         else:
             return
 
         max_concurrent = max(1, max_concurrent or 1)
         sema = asyncio.Semaphore(max_concurrent)
-        cloud_path = Path(f'content_automation/_auto_/{self.path.name}', 'Directory')
+        cloud_path = self.cloud_path
 
         async def task(p: PathLike, cp: PathLike):
                 async with sema:
@@ -424,7 +847,7 @@ class MyVideo(_M, _ComE):
         #tasks.append(task(self.uncompressed_path, cloud_path * self.uncompressed_path.full_name))
         for pl in platforms:
             p = self.get_converted_path(pl)
-            if p.exists:
+            if p.full_name in self.files:
                 tasks.append(task(p, cloud_path * p.full_name))
 
         if tasks:
@@ -441,20 +864,20 @@ class MyVideo(_M, _ComE):
             skip_errors: bool = True
         ) -> None:
         if platforms is None:
-            platforms = get_platforms()
+            platforms = list(get_platform_registry())
 
         elif platforms:
             if isinstance(platforms, str):
                 platforms = [platforms]
         
             [pl.lower() for pl in platforms]
-            assert all(pl in get_platforms() for pl in platforms), f'Invalid platform'
+            assert all(pl in get_platform_registry() for pl in platforms), f'Invalid platform'
         else:
             return
 
         max_concurrent = max(1, max_concurrent or 1)
         sema = asyncio.Semaphore(max_concurrent)
-        cloud_path = Path(f'content_automation/_auto_/{self.path.name}', 'Directory')
+        cloud_path = self.cloud_path
 
         self.path(exist_ok=True)
 
@@ -478,7 +901,7 @@ class MyVideo(_M, _ComE):
 
         for u in self.uploaders:
             p = self.get_converted_path(u.name)
-            if p and (overwrite or (not p.exists)):
+            if p and (overwrite or (p.full_name not in self.files)):
                 tasks.append(task(cloud_path * p.full_name, p))
 
         if tasks:
@@ -502,7 +925,7 @@ class MyVideo(_M, _ComE):
             send_to_trash: bool = True,
             skip_errors: bool = True
         ) -> None:
-        cloud_path = Path(f'content_automation/_auto_/{self.path.name}', 'Directory')
+        cloud_path = self.cloud_path
 
         if platforms is None:
             Global.mega.delete(cloud_path, send_to_trash=send_to_trash, skip_errors=skip_errors)
@@ -513,7 +936,7 @@ class MyVideo(_M, _ComE):
                 platforms = [platforms]
         
             [pl.lower() for pl in platforms]
-            assert all(pl in get_platforms() for pl in platforms), f'Invalid platform'
+            assert all(pl in get_platform_registry() for pl in platforms), f'Invalid platform'
         else:
             return
 
@@ -541,6 +964,187 @@ class UListMyVideos(_M, _ComES[MyVideo]):
         self.delete_from_mega(skip_errors=True)
         return super().delete(archive, remove_file=remove_file, send_to_trash=send_to_trash, not_exists_ok=not_exists_ok)
 
+    async def adelete(self, archive = False, remove_file = True, send_to_trash = False, not_exists_ok = True):
+        await asyncio.to_thread(self.delete_from_mega, skip_errors=True)
+        return await super().adelete(archive, remove_file=remove_file, send_to_trash=send_to_trash, not_exists_ok=not_exists_ok)
+
+    def _sweep_remote(self) -> None:
+        self.delete_from_mega(send_to_trash=True, skip_errors=True)
+
+    @classmethod
+    def _build_events_filters(cls,
+            platform: str | None = None,
+            account: str | None = None,
+            state: str | UploadStatuses | None = None,
+            status: str | Statuses | None = None
+        ) -> tuple[str, list]:
+        filters = []
+        params = []
+        for key, value in (('platform', platform), ('account', account), ('state', state), ('status', status)):
+            if value is not None:
+                params.append(value.value if isinstance(value, Enum) else value)
+                filters.append(f'{key} = ${len(params)}')
+        return (' WHERE ' + ' AND '.join(filters)) if filters else '', params
+
+    @classmethod
+    def count_statuses(cls,
+            account: str | None = None,
+            status: str | Statuses | None = None
+        ) -> dict[tuple[str, Statuses], int]:
+        """Counts videos per (account, status) from the trigger-maintained status_counts table."""
+        where, params = cls._build_events_filters(account=account, status=status)
+        with cls.DBContext:
+            _, rows = cls._fetch_cached(cls._cursor, f'''SELECT account, status, n FROM "{cls._STATUS_COUNTS_TABLE_NAME}"{where};''', params)
+        return {(acc, cls.statuses(st)): n for acc, st, n in rows if n}
+
+    @classmethod
+    def count_post_events(cls,
+            platform: str | None = None,
+            account: str | None = None,
+            state: str | UploadStatuses | None = None
+        ) -> dict[tuple[str, str, UploadStatuses], int]:
+        """Counts post events per (account, platform, state) from the trigger-maintained post_event_counts table."""
+        where, params = cls._build_events_filters(platform=platform, account=account, state=state)
+        with cls.DBContext:
+            _, rows = cls._fetch_cached(cls._cursor, f'''SELECT account, platform, state::text, n FROM "{cls._EVENT_COUNTS_TABLE_NAME}"{where};''', params)
+        return {(acc, pl, cls.uploadstatuses(st)): n for acc, pl, st, n in rows if n}
+
+    @classmethod
+    def count_posted_days(cls,
+            account: str | None = None,
+            since: date | None = None
+        ) -> dict[tuple[str, date], int]:
+        """Counts completely posted videos per (account, day of the last upload) from the trigger-maintained post_day_counts table."""
+        where, params = cls._build_events_filters(account=account)
+        if since is not None:
+            params.append(since)
+            where += f"{' AND' if where else ' WHERE'} day >= ${len(params)}"
+        with cls.DBContext:
+            _, rows = cls._fetch_cached(cls._cursor, f'''SELECT account, day, n FROM "{cls._POST_DAY_COUNTS_TABLE_NAME}"{where};''', params)
+        return {(acc, day): n for acc, day, n in rows if n}
+
+    @classmethod
+    def count_initiated(cls, account: str | None = None) -> dict[str, int]:
+        """Counts INITIATED platforms of the READY videos per account, from the post_queue table."""
+        where, params = cls._build_events_filters(account=account)
+        with cls.DBContext:
+            _, rows = cls._fetch_cached(cls._cursor, f'''SELECT account, sum(initiated) FROM "{cls._QUEUE_TABLE_NAME}"{where} GROUP BY account;''', params)
+        return {acc: int(n) for acc, n in rows if n}
+
+    @classmethod
+    def rebuild_post_counters(cls) -> None:
+        """Derives post_queue, post_days and their counts again from the video rows."""
+        with cls.DBContext:
+            # Writers wait until the rebuild is committed, so no change is counted twice or missed
+            cls._cursor.execute(f'''LOCK TABLE "{cls._TABLE_NAME}", "{cls._EVENTS_TABLE_NAME}" IN SHARE ROW EXCLUSIVE MODE;''')
+            cls._cursor.execute(f'''DELETE FROM "{cls._QUEUE_TABLE_NAME}";''')
+            cls._cursor.execute(f'''DELETE FROM "{cls._POST_DAYS_TABLE_NAME}";''')
+            # Drifted counts are dropped, the triggers count the post_days inserted below again
+            cls._cursor.execute(f'''DELETE FROM "{cls._POST_DAY_COUNTS_TABLE_NAME}";''')
+            cls._queue_from_rows(cls._cursor)
+            cls._post_days_from_rows(cls._cursor)
+            cls._db.commit()
+        cls._E._db_updated = True
+        cls.logger.info(f'{cls._QUEUE_TABLE_NAME}, {cls._POST_DAYS_TABLE_NAME} and {cls._POST_DAY_COUNTS_TABLE_NAME} rebuilt.')
+
+    @classmethod
+    def refresh_account_counters(cls, accounts: list[str]) -> None:
+        """Derives post_queue and post_days again for the videos of `accounts`, whose uploaders changed."""
+        try:
+            with cls.DBContext:
+                cls._cursor.execute(f'''
+                    SELECT id FROM "{cls._TABLE_NAME}"
+                    WHERE account = ANY($1) AND status IN ('{Statuses.READY.value}', '{Statuses.DONE.value}');
+                ''', (accounts,))
+                ids = [row[0] for row in cls._cursor.fetchall()]
+                cls._refresh_dependents(cls._cursor, ids)
+                cls._db.commit()
+        except Exception as e:
+            # The account change itself is committed, only the counters lag behind
+            cls.logger.error(f"Post counters of {', '.join(accounts)} not refreshed, run 'posts_stats --rebuild'", skippable=True, base_error=e)
+            return
+        cls._E._db_updated = True
+        cls.logger.info(f"Post counters of {', '.join(accounts)} refreshed ({len(ids)} videos).")
+
+    @classmethod
+    def check_post_counters(cls, account: str | None = None) -> dict[str, dict]:
+        """Mismatches between the post counters and a full scan of the READY and DONE videos."""
+        mvs = cls.load(('status', 'IN', (cls.statuses.READY, cls.statuses.DONE)), **({'account': account} if account is not None else {}))
+
+        posted_days: dict[tuple[str, date], int] = {}
+        initiated: dict[str, int] = {}
+        for mv in mvs:
+            acc = mv.account or ''
+            if mv.is_posted and (dates := list(mv.publication_dates.dates.values())):
+                key = (acc, max(dates).date())
+                posted_days[key] = posted_days.get(key, 0) + 1
+            if mv.status == cls.statuses.READY:
+                if (n := sum(mv.get_upload_status(u.name) == cls.uploadstatuses.INITIATED for u in mv.uploaders)):
+                    initiated[acc] = initiated.get(acc, 0) + n
+
+        # Read past the QueryCache, the counters are checked as stored
+        QueryCache.invalidate(cls._TABLE_NAME)
+        counted_days = cls.count_posted_days(account=account)
+        counted_initiated = cls.count_initiated(account=account)
+
+        mismatches = {
+            'posted_days': {k: (posted_days.get(k, 0), counted_days.get(k, 0))
+                            for k in posted_days.keys() | counted_days.keys() if posted_days.get(k, 0) != counted_days.get(k, 0)},
+            'initiated': {k: (initiated.get(k, 0), counted_initiated.get(k, 0))
+                          for k in initiated.keys() | counted_initiated.keys() if initiated.get(k, 0) != counted_initiated.get(k, 0)}
+        }
+        n = len(mismatches['posted_days']) + len(mismatches['initiated'])
+        if n:
+            cls.logger.warning(f'Post counters checked against {len(mvs)} videos: {n} mismatches.')
+        else:
+            cls.logger.info(f'Post counters checked against {len(mvs)} videos: no mismatch.')
+        return mismatches
+
+    @classmethod
+    def load_post_queue(cls,
+            platform: str | None = None,
+            state: str | UploadStatuses = UploadStatuses.INITIATED,
+            account: str | None = None,
+            auto_save: bool = False,
+            auto_delete: bool = False
+        ) -> 'UListMyVideos':
+        """Loads the videos having a post event in `state`, optionally for one platform and/or account."""
+        where, params = cls._build_events_filters(platform=platform, account=account, state=state)
+        with cls.DBContext:
+            _, rows = cls._fetch_cached(cls._cursor, f'''SELECT DISTINCT video_id FROM "{cls._EVENTS_TABLE_NAME}"{where};''', params)
+        ids = [row[0] for row in rows]
+        if not ids:
+            return cls()
+        return cls.load(('id', 'IN', ids), auto_save=auto_save, auto_delete=auto_delete)
+
+    @classmethod
+    def next_posts(cls,
+            account: str | None = None,
+            platform: str | None = None,
+            limit: int | None = None
+        ) -> list[str]:
+        """Ids of the READY videos waiting for their INITIATED posts, best first, from the head of post_queue."""
+        filters = []
+        params = []
+        if account is not None:
+            params.append(account)
+            filters.append(f'q.account = ${len(params)}')
+        if platform is not None:
+            params.append(platform.lower())
+            filters.append(f'''EXISTS (SELECT 1 FROM "{cls._EVENTS_TABLE_NAME}" e WHERE e.video_id = q.video_id
+                           AND e.platform = ${len(params)} AND e.state = '{UploadStatuses.INITIATED.value}')''')
+        if limit is not None:
+            params.append(limit)
+        with cls.DBContext:
+            # Not through the QueryCache, the phone scripts writing the queue run in other processes
+            cls._cursor.execute(f'''
+                SELECT q.video_id FROM "{cls._QUEUE_TABLE_NAME}" q
+                {('WHERE ' + ' AND '.join(filters)) if filters else ''}
+                ORDER BY q.initiated DESC, q.created, q.video_id
+                {f'LIMIT ${len(params)}' if limit is not None else ''};
+            ''', params)
+            return [row[0] for row in cls._cursor.fetchall()]
+
     @property
     def urls(self) -> list[list[str]]:
         return [v.urls for v in self._elements]
@@ -550,6 +1154,21 @@ class UListMyVideos(_M, _ComES[MyVideo]):
         for v in self._elements:
             v.urls = value
 
+    def find_by_url(self, urls: ty.Iterable[str]) -> dict[str, MyVideo]:
+        """Videos of the list posted at `urls` (matched on platform and video id), urls without a video are left out."""
+        index = {}
+        for v in self._elements:
+            for url in v.urls_by_platform.values():
+                platform, _, wid = _video_info(url)
+                index.setdefault((platform, wid), v)
+
+        found = {}
+        for url in urls:
+            platform, _, wid = _video_info(url)
+            if platform and (v := index.get((platform, wid))) is not None:
+                found[url] = v
+        return found
+
     @property
     def publication_dates(self) -> list[dict[str, str]]:
         return [v.publication_dates for v in self._elements]
@@ -663,14 +1282,25 @@ class UListMyVideos(_M, _ComES[MyVideo]):
 
     def delete_from_mega(self,
             platforms: str | list[str] | None = None,
+            send_to_trash: bool = True,
             skip_errors: bool = True
         ) -> None:
+        if platforms is None:
+            # Whole folders, resolved against a single fetch of the Mega file tree
+            if self._elements:
+                Global.mega.delete_many([v.cloud_path for v in self._elements],
+                                        send_to_trash=send_to_trash, skip_errors=skip_errors)
+            return
+
         for v in self._elements:
             v.delete_from_mega(
                 platforms=platforms,
+                send_to_trash=send_to_trash,
                 skip_errors=skip_errors
             )
 
 _M._ES = UListMyVideos
 MyVideo.register()
+# post_queue and post_days hold the uploaders of the accounts at the time they were derived
+on_accounts_changed(UListMyVideos.refresh_account_counters)
 
@@ -0,0 +1,150 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import typing as ty
+import zlib
+
+from array import array
+from enum import IntEnum
+
+from src.modules.paths import PathLike
+from src.modules.display import Logger
+
+
+class Encodings(IntEnum):
+    DICT = 1    # Dictionary of distinct values + one integer code per row
+    ZJSON = 2   # zlib compressed JSON array of the values
+
+
+class Snapshot:
+    """Versioned column-oriented binary snapshot of an entity table, read through mmap one column at a time."""
+
+    # Little endian: header (MAGIC, version, rows, columns, table name), then per column its directory entry
+    # (name, encoding, offset, length) and its block (DICT: dictionary, typecode, codes / ZJSON: zlib JSON values)
+    MAGIC = b'ULSNAP'
+    VERSION = 1
+    _HEADER = struct.Struct('<6sHIHH')   # magic, version, rows, columns, table name length
+    _ENTRY = struct.Struct('<HBQQ')      # name length, encoding, offset, length
+    _U32 = struct.Struct('<I')
+    COMPRESSION_LEVEL = 6
+    logger = Logger('[Snapshot]')
+
+    def __init__(self, path: PathLike) -> None:
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._view = memoryview(self._mm)
+        self._read_directory()
+
+    def _read_directory(self) -> None:
+        magic, version, self.rows, n_columns, name_len = self._HEADER.unpack_from(self._view, 0)
+        if magic != self.MAGIC:
+            raise ValueError(f'Not a snapshot file: {self.path}')
+        if version > self.VERSION:
+            raise ValueError(f'Snapshot version {version} is not supported (max {self.VERSION}): {self.path}')
+        pos = self._HEADER.size
+        self.table = bytes(self._view[pos:pos + name_len]).decode('utf-8')
+        pos += name_len
+
+        self._directory: dict[str, tuple[Encodings, int, int]] = {}
+        for _ in range(n_columns):
+            name_len, encoding, offset, length = self._ENTRY.unpack_from(self._view, pos)
+            pos += self._ENTRY.size
+            name = bytes(self._view[pos:pos + name_len]).decode('utf-8')
+            pos += name_len
+            self._directory[name] = (Encodings(encoding), offset, length)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._directory)
+
+    def column(self, name: str) -> list:
+        encoding, offset, length = self._directory[name]
+        block = self._view[offset:offset + length]
+
+        if encoding == Encodings.ZJSON:
+            return json.loads(zlib.decompress(block))
+
+        dict_len = self._U32.unpack_from(block, 0)[0]
+        pos = self._U32.size
+        values = json.loads(zlib.decompress(block[pos:pos + dict_len]))
+        pos += dict_len
+        codes = array(chr(block[pos]))
+        codes.frombytes(block[pos + 1:])
+        if sys.byteorder == 'big':
+            codes.byteswap()
+        return [values[c] for c in codes]
+
+    def close(self) -> None:
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @classmethod
+    def _encode_dict(cls, values: list) -> bytes:
+        index: dict[str, int] = {}
+        dictionary = []
+        codes = []
+        for v in values:
+            # JSON keys so that unhashable values (lists, dicts) can be dictionary encoded too
+            key = json.dumps(v, sort_keys=True)
+            if key not in index:
+                index[key] = len(dictionary)
+                dictionary.append(v)
+            codes.append(index[key])
+
+        typecode = 'B' if len(dictionary) <= 0xFF else 'H' if len(dictionary) <= 0xFFFF else 'I'
+        codes = array(typecode, codes)
+        if sys.byteorder == 'big':
+            codes.byteswap()
+        zdict = zlib.compress(json.dumps(dictionary, separators=(',', ':')).encode('utf-8'), cls.COMPRESSION_LEVEL)
+        return cls._U32.pack(len(zdict)) + zdict + typecode.encode() + codes.tobytes()
+
+    @classmethod
+    def write(cls, path: PathLike, table: str, columns: dict[str, list], dict_columns: ty.Iterable[str] = ()) -> int:
+        """Writes `columns` (all of the same length) to `path`, returns the file size."""
+        lengths = {len(v) for v in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f'Columns of different lengths: {lengths}')
+        rows = lengths.pop() if lengths else 0
+        dict_columns = set(dict_columns)
+
+        blocks = []
+        for name, values in columns.items():
+            if name in dict_columns:
+                blocks.append((name, Encodings.DICT, cls._encode_dict(values)))
+            else:
+                blocks.append((name, Encodings.ZJSON,
+                               zlib.compress(json.dumps(values, separators=(',', ':')).encode('utf-8'), cls.COMPRESSION_LEVEL)))
+
+        table_name = table.encode('utf-8')
+        names = [name.encode('utf-8') for name, _, _ in blocks]
+        offset = cls._HEADER.size + len(table_name) + sum(cls._ENTRY.size + len(n) for n in names)
+
+        # Written aside then renamed, a reader never maps a half written snapshot
+        tmp_path = f'{os.fspath(path)}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(cls._HEADER.pack(cls.MAGIC, cls.VERSION, rows, len(blocks), len(table_name)))
+            f.write(table_name)
+            for n, (_, encoding, data) in zip(names, blocks):
+                f.write(cls._ENTRY.pack(len(n), encoding, offset, len(data)))
+                f.write(n)
+                offset += len(data)
+            for _, _, data in blocks:
+                f.write(data)
+        os.replace(tmp_path, path)
+
+        cls.logger.info(f'Snapshot of {rows} {table} rows written ({offset} bytes)')
+        return offset
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-from src.dataproc.accounts import get_accounts, Account
+from src.dataproc.accounts import get_accounts, get_accounts_generation, get_platform_accounts, get_platforms, Account
 
 
 # This will replace uploader modules which is not available for phone
@@ -15,7 +15,7 @@ class Uploader:
         return self.name
     
     def get_accounts(self) -> list[Account]:
-        return [acc for acc in get_accounts() if self.name in acc.platforms]
+        return get_platform_accounts(self.name)
     
     def get_account_names(self) -> list[str]:
         return [acc.uniquename for acc in self.get_accounts()]
@@ -24,4 +24,26 @@ class Uploader:
         return [acc.uniquename for acc in self.get_accounts()]
     
 
-UPLOADERS = [Uploader(name) for name in {p for a in get_accounts() for p in a.platforms}]
\ No newline at end of file
+UPLOADERS = [Uploader(name) for name in get_platforms()]
+
+
+def _account_index() -> dict[str, tuple[list[Uploader], frozenset[str]]]:
+    """Uploaders (and their names) of every account."""
+    global _index
+    generation = get_accounts_generation()
+    if _index is None or _index[0] != generation:
+        index: dict[str, tuple[list[Uploader], frozenset[str]]] = {}
+        for u in UPLOADERS:
+            for uniquename in u.get_account_uniquenames():
+                index.setdefault(uniquename, ([], frozenset()))[0].append(u)
+        _index = (generation, {acc: (uploaders, frozenset(u.name for u in uploaders)) for acc, (uploaders, _) in index.items()})
+    return _index[1]
+
+def get_account_uploaders(uniquename: str) -> list[Uploader]:
+    return list(_account_index().get(uniquename, ((), frozenset()))[0])
+
+def get_account_uploader_names(uniquename: str) -> frozenset[str]:
+    return _account_index().get(uniquename, ((), frozenset()))[1]
+
+
+_index: tuple[int, dict[str, tuple[list[Uploader], frozenset[str]]]] | None = None
@@ -7,6 +7,7 @@ import urllib.parse
 from sys import platform
 from time import sleep
 from datetime import datetime
+from enum import Enum
 
 from src.modules.paths import Path
 from src.modules.internal_script import get_func_kwargs_an
@@ -29,6 +30,10 @@ def to_even(v: int | float, round_up: bool = False) -> int:
 
 ALPHABET = "abcdefghijklmnopqrstuvwxyz"
 
+def chunks(seq: ty.Sequence[T], size: int) -> ty.Iterator[ty.Sequence[T]]:
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
 def is_duplicated(lst: ty.Iterable, e: ty.Any) -> bool:
     lst = list(lst)
     for _ in (0, 1):
@@ -138,6 +143,46 @@ def build_sql_keys(cls) -> str:
     sdata = cls._sdata if getattr(cls, '_sdata', None) else get_func_kwargs_an(cls.__init__)
     return (f"id, {', '.join(name for name in sdata.keys())}")
 
+def build_sql_array(values: ty.Iterable) -> list:
+    """Single array parameter for `= ANY($n)` / `<> ALL($n)` filters."""
+    return [v.value if isinstance(v, Enum) else v for v in values]
+
+def build_sql_json_row(obj) -> dict:
+    sdata = obj._sdata if getattr(obj, '_sdata', None) else get_func_kwargs_an(obj.__init__)
+    row = {'id': obj.id}
+    for k in sdata.keys():
+        value = getattr(obj, k)
+        if isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, (set, tuple)):
+            value = list(value)
+        # Unquoted column names are folded to lower case by PostgreSQL
+        row[k.lower()] = value
+    return row
+
+def build_sql_bulk_args(objs: ty.Iterable) -> str:
+    """Encodes objects as a single json array parameter for `build_sql_bulk_save_command`."""
+    return json.dumps([build_sql_json_row(obj) for obj in objs], separators=(',', ':'))
+
+def build_sql_bulk_save_command(cls) -> str:
+    """Upsert of many rows in one statement, rows are passed as a single jsonb array parameter."""
+    sdata = cls._sdata if getattr(cls, '_sdata', None) else get_func_kwargs_an(cls.__init__)
+    keys = build_sql_keys(cls)
+    return (f'INSERT INTO "{cls._TABLE_NAME}" ({keys})\nSELECT {keys} FROM jsonb_populate_recordset(NULL::"{cls._TABLE_NAME}", $1::jsonb)'
+            + "\nON CONFLICT(id) DO UPDATE SET\n    "
+            + ",\n    ".join(f"{item_name} = excluded.{item_name}" for item_name in sdata.keys()))
+
+def build_sql_bulk_move_command(cls, ids_table: str) -> str:
+    """Upsert by id for partitioned tables, new ids are claimed in `ids_table` since ON CONFLICT(id) is not possible."""
+    sdata = cls._sdata if getattr(cls, '_sdata', None) else get_func_kwargs_an(cls.__init__)
+    keys = build_sql_keys(cls)
+    return (f'WITH batch AS (SELECT {keys} FROM jsonb_populate_recordset(NULL::"{cls._TABLE_NAME}", $1::jsonb)),'
+            + f'\nupdated AS (UPDATE "{cls._TABLE_NAME}" t SET '
+            + ", ".join(f"{item_name} = b.{item_name}" for item_name in sdata.keys())
+            + ' FROM batch b WHERE t.id = b.id RETURNING t.id),'
+            + f'\nclaimed AS (INSERT INTO "{ids_table}" (id) SELECT id FROM batch WHERE id NOT IN (SELECT id FROM updated) RETURNING id)'
+            + f'\nINSERT INTO "{cls._TABLE_NAME}" ({keys})\nSELECT {keys} FROM batch WHERE id IN (SELECT id FROM claimed)')
+
 
 ### URLS / FILENAMES ######################################################################################
 